@@ -0,0 +1,176 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import tracemalloc
+from time import perf_counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'Deepseek'), os.path.join(ROOT, 'Gemini')]
+
+import SQLAnalyzerDS
+import SQLAnalyzerDS20250407
+import SQLAnalyzerGM
+import SQLTablesDS
+import sqlparse.engine.grouping
+from SQLProfileDS import Profiler
+from SQLSchedulerDS import CteScheduler
+from SQLGenerator import SCENARIOS, generate_sql
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+# CTEs resolved on a process pool; the pool starts on the first case that uses it
+CTE_SCHEDULER = CteScheduler()
+# sqlparse 0.5+ refuses statements over 10000 tokens (a guard against
+# untrusted input); the generated scenarios are larger than that
+if hasattr(sqlparse.engine.grouping, 'MAX_GROUPING_TOKENS'):
+    sqlparse.engine.grouping.MAX_GROUPING_TOKENS = None
+
+# name -> analyze(sql, profiler). Analyzers that take a Profiler report
+# their parse phase from it (the warm parser they actually use) and lineage
+# as the rest of the same run; the others report totals only.
+ANALYZERS = {
+    'ds': lambda sql, profiler: SQLAnalyzerDS.process_sql(sql, profiler=profiler),
+    'ds_dag': lambda sql, profiler: SQLAnalyzerDS.process_sql(sql, profiler=profiler, scheduler=CTE_SCHEDULER),
+    'ds20250407': lambda sql, profiler: SQLAnalyzerDS20250407.process_sql(sql),
+    'gm': lambda sql, profiler: SQLAnalyzerGM.analyze_sql(sql),
+    # table-level dependencies only, from the token scan
+    'ds_tables': lambda sql, profiler: list(SQLTablesDS.dependency_rows(SQLTablesDS.table_dependencies(sql))),
+}
+PROFILED = frozenset(('ds', 'ds_dag'))
+
+def count_rows(result):
+    # A case without lineage, or with Error rows, fails instead of being timed
+    rows = result if isinstance(result, list) else []
+    for row in rows:
+        if isinstance(row, dict) and row.get('result_column') == 'Error':
+            raise RuntimeError(f"analysis error: {row.get('source_column')}")
+    if not rows:
+        raise RuntimeError("no lineage rows")
+    return len(rows)
+
+def run_case(sql, analyzer, repeat):
+    analyze = ANALYZERS[analyzer]
+    count_rows(analyze(sql, None))  # warm-up: imports, dialect setup, first-call caches
+
+    parse_times, lineage_times, total_times = [], [], []
+    rows = 0
+    for _ in range(repeat):
+        profiler = Profiler() if analyzer in PROFILED else None
+        start = perf_counter()
+        rows = count_rows(analyze(sql, profiler))
+        elapsed = perf_counter() - start
+        total_times.append(elapsed)
+        if profiler is not None:
+            parse = profiler.phases.get('parse', (0, 0.0))[1]
+            parse_times.append(parse)
+            lineage_times.append(elapsed - parse)
+
+    # Separate run for memory, tracemalloc slows everything down
+    tracemalloc.start()
+    analyze(sql, None)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'parse_ms': median_ms(parse_times),
+        'lineage_ms': median_ms(lineage_times),
+        'total_ms': median_ms(total_times),
+        'peak_kb': round(peak / 1024, 1),
+        'rows': rows,
+        'sql_chars': len(sql)
+    }
+
+def median_ms(times):
+    return round(statistics.median(times) * 1000, 3) if times else None
+
+def run_benchmark(scenarios, analyzers, repeat):
+    results = {}
+    for name in scenarios:
+        sql = generate_sql(**SCENARIOS[name])
+        results[name] = {}
+        for analyzer in analyzers:
+            try:
+                results[name][analyzer] = run_case(sql, analyzer, repeat)
+            except Exception as e:
+                results[name][analyzer] = {'error': f'{type(e).__name__}: {e}'}
+    return results
+
+def compare(results, baseline, threshold):
+    # Returns human-readable regressions against a saved baseline
+    regressions = []
+    for name, by_analyzer in results.items():
+        for analyzer, current in by_analyzer.items():
+            previous = baseline.get(name, {}).get(analyzer)
+            if not previous or 'error' in previous or 'error' in current:
+                continue
+            if current['total_ms'] > previous['total_ms'] * (1 + threshold):
+                regressions.append(f"{name}/{analyzer}: total {previous['total_ms']:.1f}ms -> {current['total_ms']:.1f}ms")
+            if current['peak_kb'] > previous['peak_kb'] * (1 + threshold):
+                regressions.append(f"{name}/{analyzer}: peak {previous['peak_kb']:.0f}KB -> {current['peak_kb']:.0f}KB")
+            if current['rows'] != previous['rows']:
+                regressions.append(f"{name}/{analyzer}: rows {previous['rows']} -> {current['rows']}")
+    return regressions
+
+def print_report(results):
+    print(f"{'SCENARIO':<20}{'ANALYZER':<12}{'PARSE ms':>10}{'LINEAGE ms':>12}{'TOTAL ms':>10}{'PEAK KB':>10}{'ROWS':>8}")
+    for name, by_analyzer in results.items():
+        for analyzer, r in by_analyzer.items():
+            if 'error' in r:
+                print(f"{name:<20}{analyzer:<12}  {r['error']}")
+                continue
+            parse = f"{r['parse_ms']:.1f}" if r['parse_ms'] is not None else '-'
+            lineage = f"{r['lineage_ms']:.1f}" if r['lineage_ms'] is not None else '-'
+            print(f"{name:<20}{analyzer:<12}{parse:>10}{lineage:>12}{r['total_ms']:>10.1f}{r['peak_kb']:>10.0f}{r['rows']:>8}")
+
+def failures(results):
+    return [f"{name}/{analyzer}: {r['error']}" for name, by_analyzer in results.items()
+            for analyzer, r in by_analyzer.items() if 'error' in r]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the SQL lineage analyzers on synthetic SQL")
+    parser.add_argument('-s', '--scenario', action='append', choices=sorted(SCENARIOS),
+                        help="scenario to run (repeatable, default: all)")
+    parser.add_argument('-a', '--analyzer', action='append', choices=sorted(ANALYZERS),
+                        help="analyzer to run (repeatable, default: all)")
+    parser.add_argument('-r', '--repeat', type=int, default=5, help="timed runs per case (median is reported)")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="baseline JSON file")
+    parser.add_argument('--save', action='store_true', help="save these results as the new baseline")
+    parser.add_argument('--threshold', type=float, default=0.25, help="allowed slowdown before flagging a regression")
+    parser.add_argument('--cte-workers', type=int, default=None,
+                        help="processes of the ds_dag CTE scheduler (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    if args.cte_workers:
+        CTE_SCHEDULER.workers = args.cte_workers
+    try:
+        results = run_benchmark(args.scenario or list(SCENARIOS), args.analyzer or list(ANALYZERS),
+                                args.repeat)
+    finally:
+        CTE_SCHEDULER.close()
+    print_report(results)
+    failed = failures(results)
+    if failed:
+        print("\nFAILED:")
+        for line in failed:
+            print(f"  {line}")
+
+    if args.save:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"\nbaseline saved to {args.baseline}")
+        return 1 if failed else 0
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print("\nREGRESSIONS:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("\nno regressions against baseline")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""Synthetic SQL generator for benchmarking the analyzers.
+
+Every knob scales one part of the statement the analyzers walk:
+cte_depth      number of CTEs in the WITH chain
+cte_fanin      how many earlier CTEs each CTE joins (1 = straight chain, >1 = diamonds)
+cte_branches   independent CTE chains the WITH list is split into (width of the CTE DAG)
+select_width   columns in every select list
+join_count     base tables joined to the main query
+subquery_depth nesting levels of the derived table joined to the main query
+case_size      WHEN branches in the CASE column of the main select list
+"""
+
+def table_columns(select_width):
+    return ['key'] + [f'col{i}' for i in range(select_width)]
+
+def generate_cte(index, cte_fanin, select_width, cte_branches=1):
+    columns = table_columns(select_width)
+    # The first CTE of each branch reads a base table, the others the
+    # previous CTEs of their own branch
+    upstream = [index - cte_branches * (1 + i) for i in range(cte_fanin)]
+    upstream = [cte for cte in upstream if cte >= 0]
+    if not upstream:
+        select_list = ', '.join(columns)
+        return f"cte{index} AS (\n  SELECT {select_list}\n  FROM BaseTable{index}\n  WHERE col0 = 'x'\n)"
+
+    aliases = [f'u{i}' for i in range(len(upstream))]
+    select_list = ', '.join(
+        [f'{aliases[0]}.key'] +
+        [f'{aliases[i % len(aliases)]}.{col}' for i, col in enumerate(columns[1:])]
+    )
+    from_clause = f'cte{upstream[0]} {aliases[0]}'
+    for alias, cte in zip(aliases[1:], upstream[1:]):
+        from_clause += f'\n  JOIN cte{cte} {alias} ON {alias}.key = {aliases[0]}.key'
+    return f"cte{index} AS (\n  SELECT {select_list}\n  FROM {from_clause}\n)"
+
+def generate_subquery(depth, select_width):
+    columns = ', '.join(table_columns(select_width))
+    inner = f'SELECT {columns} FROM SubTable{depth}'
+    for level in range(depth - 1, 0, -1):
+        inner = f'SELECT {columns} FROM ({inner}) s{level + 1}'
+    return inner
+
+def generate_case(case_size, sources):
+    branches = '\n    '.join(
+        f"WHEN {sources[i % len(sources)]}.col{i % 3} > {i} THEN {sources[(i + 1) % len(sources)]}.col{(i + 1) % 3}"
+        for i in range(case_size)
+    )
+    return f"CASE\n    {branches}\n    ELSE 0\n  END AS case_col"
+
+def generate_sql(cte_depth=3, cte_fanin=1, select_width=10, join_count=2, subquery_depth=1, case_size=0,
+                 cte_branches=1):
+    parts = []
+    if cte_depth:
+        ctes = ',\n'.join(generate_cte(i, cte_fanin, select_width, cte_branches) for i in range(cte_depth))
+        parts.append(f'WITH {ctes}')
+
+    main_source = f'cte{cte_depth - 1}' if cte_depth else 'BaseTable0'
+    sources = ['m'] + [f't{j}' for j in range(join_count)]
+    if subquery_depth:
+        sources.append('s1')
+
+    select_list = []
+    for i in range(select_width):
+        source = sources[i % len(sources)]
+        if i % 5 == 4:
+            other = sources[(i + 1) % len(sources)]
+            select_list.append(f'{source}.col{i} * {other}.col{i} AS calc{i}')
+        else:
+            select_list.append(f'{source}.col{i}')
+    if case_size:
+        select_list.append(generate_case(case_size, sources))
+
+    from_clause = f'{main_source} m'
+    for j in range(join_count):
+        from_clause += f'\n  LEFT OUTER JOIN JoinTable{j} t{j} ON t{j}.key = m.key'
+    if subquery_depth:
+        from_clause += f'\n  LEFT OUTER JOIN ({generate_subquery(subquery_depth, select_width)}) s1 ON s1.key = m.key'
+
+    parts.append('SELECT ' + ',\n  '.join(select_list) + f'\nFROM {from_clause}')
+    return '\n'.join(parts)
+
+# Named scenarios used by the benchmark runner; each stresses one dimension
+SCENARIOS = {
+    'small': dict(cte_depth=2, cte_fanin=1, select_width=6, join_count=1, subquery_depth=1, case_size=0),
+    'wide_select': dict(cte_depth=2, cte_fanin=1, select_width=300, join_count=4, subquery_depth=1, case_size=0),
+    'many_joins': dict(cte_depth=1, cte_fanin=1, select_width=60, join_count=40, subquery_depth=0, case_size=0),
+    'deep_cte_chain': dict(cte_depth=60, cte_fanin=1, select_width=20, join_count=1, subquery_depth=0, case_size=0),
+    'cte_diamonds': dict(cte_depth=30, cte_fanin=3, select_width=20, join_count=1, subquery_depth=0, case_size=0),
+    'nested_subqueries': dict(cte_depth=1, cte_fanin=1, select_width=20, join_count=1, subquery_depth=40, case_size=0),
+    'case_heavy': dict(cte_depth=2, cte_fanin=1, select_width=20, join_count=3, subquery_depth=1, case_size=500),
+    # dbt-style models: 200+ CTEs, many of them independent
+    'wide_cte_dag': dict(cte_depth=240, cte_fanin=2, select_width=40, join_count=1, subquery_depth=0, case_size=0,
+                         cte_branches=24),
+    'deep_cte_dag': dict(cte_depth=240, cte_fanin=2, select_width=40, join_count=1, subquery_depth=0, case_size=0,
+                         cte_branches=2),
+}
+
+if __name__ == "__main__":
+    import sys
+    name = sys.argv[1] if len(sys.argv) > 1 else 'small'
+    print(generate_sql(**SCENARIOS[name]))
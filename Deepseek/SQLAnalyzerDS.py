@@ -1,62 +1,411 @@
-import sqlglot
+import hashlib
+from collections import namedtuple
+from sys import intern
+from time import perf_counter
+
 from sqlglot import exp
-import tkinter as tk
-from tkinter import ttk, scrolledtext
 
-def process_sql(sql):
+from SQLDialectDS import dialect_key, parse_sql
+
+ROW_FIELDS = ('result_query', 'result_column', 'source_table', 'source_column')
+
+class LineageRow(namedtuple('LineageRow', ROW_FIELDS + ('target_object',))):
+    """Compact lineage row. Names are interned, so the thousands of rows of a
+    wide query share one copy of each table/column string."""
+    __slots__ = ()
+
+    def get(self, field, default=None):
+        # Lets writers treat LineageRow and row dicts alike
+        return getattr(self, field, default)
+
+    def as_dict(self):
+        return dict(zip(self._fields, self))
+
+def make_row(result_query, result_column, source_table, source_column, target_object=''):
+    return LineageRow(intern(result_query or ''), intern(result_column), intern(source_table),
+                      intern(source_column), intern(target_object or ''))
+
+# Profiler and schema catalog of the analysis currently executing (see
+# iter_lineage); hot paths only pay an `is None` check when they are off
+active_profiler = None
+active_catalog = None
+
+def process_sql(sql, dialect="snowflake", cache=None, stats=None, incremental=None, profiler=None, compact=False,
+                catalog=None, scheduler=None):
+    return list(iter_lineage(sql, dialect, cache, stats, incremental, profiler, compact, catalog, scheduler))
+
+def iter_lineage(sql, dialect="snowflake", cache=None, stats=None, incremental=None, profiler=None, compact=False,
+                 catalog=None, scheduler=None):
+    # Yields lineage rows as each main-query column is traced, so callers can
+    # stream output; CTEs are still resolved up front since columns depend on them.
+    # compact=True yields LineageRow tuples, otherwise the classic row dicts.
+    # catalog (SQLCatalogDS.Catalog) resolves unqualified columns and expands *.
+    # scheduler (SQLSchedulerDS.CteScheduler) resolves CTEs on a process pool.
+    rows = lineage_rows(sql, dialect, cache, stats, incremental, catalog, scheduler)
+    if not compact:
+        rows = (row.as_dict() for row in rows)
+    if profiler is None and catalog is None:
+        yield from rows
+        return
+
+    # Profiler and catalog are only installed while this generator is running,
+    # so other work interleaved by the consumer does not see them
+    global active_profiler, active_catalog
+    started = perf_counter()
+    while True:
+        previous = active_profiler, active_catalog
+        active_profiler, active_catalog = profiler, catalog
+        try:
+            row = next(rows)
+        except StopIteration:
+            break
+        finally:
+            active_profiler, active_catalog = previous
+        if profiler is not None:
+            profiler.count('rows')
+        yield row
+    if profiler is not None:
+        profiler.add_time('total', started)
+
+def lineage_rows(sql, dialect, cache, stats, incremental, catalog=None, scheduler=None):
+    profiler = active_profiler
+    cache_key = None
+    if cache is not None:
+        cache_key = cache.make_key(sql, dialect_key(dialect), catalog.fingerprint if catalog is not None else '')
+        cached = cache.get_rows(cache_key)
+        if profiler is not None:
+            profiler.count('cache_hits' if cached is not None else 'cache_misses')
+        if cached is not None:
+            if stats is not None:
+                stats['cache_hit'] = True
+            yield from map(LineageRow._make, cached)
+            return
+
     try:
-        main_query = sqlglot.parse_one(sql, read="snowflake")
+        started = perf_counter() if profiler is not None else 0
+        if cache is not None:
+            used_dialect, parsed = cache.parse(cache_key, sql, dialect)
+        else:
+            used_dialect, parsed = parse_sql(sql, dialect)
+        if profiler is not None:
+            profiler.add_time('parse', started)
+            profiler.count(f'dialect_{used_dialect}')
+        if stats is not None:
+            stats['dialect'] = used_dialect
     except Exception as e:
-        return [{'result_column': 'Error', 'source_table': 'Error', 'source_column': str(e)}]
-
-    # ctes = parsed.find_all(exp.CTE)
-    # joins = parsed.find_all(exp.Join)
-    # subqueris = parsed.find_all(exp.Subquery)
+        yield error_lineage_row(e)
+        return
 
+    target, main_query, target_columns = split_statement_target(parsed)
+    if not isinstance(main_query, exp.Query):
+        # USE, SET, ALTER, GRANT, DELETE, MERGE, plain CREATE TABLE ...: no
+        # query whose columns have lineage
+        main_query = None
     cte_registry = {}
-    if main_query.ctes:
-        cte_registry = process_ctes(main_query)
-    # if isinstance(parsed, exp.With):
-    #     cte_registry = process_ctes(parsed)
-    #     main_query = parsed.this
-    # else:
-    #     main_query = parsed
-
-    result = []
+    result = [] if cache is not None else None
     try:
-        main_columns = process_query(query_alias := '*MAIN', main_query, cte_registry)
-        for col_alias, sources in main_columns['columns'].items():
-            for query_alias, source_table, source_col in sources:
-                result.append({
-                    'result_query': query_alias,
-                    'result_column': col_alias.strip(),
-                    'source_table': source_table,
-                    'source_column': source_col
-                })
+        if main_query is not None and main_query.ctes:
+            started = perf_counter() if profiler is not None else 0
+            cte_registry = process_ctes(main_query, incremental, scheduler)
+            if profiler is not None:
+                profiler.add_time('process_ctes', started)
+                profiler.count('ctes', len(cte_registry))
+        for row in iter_query_rows('*MAIN', main_query, cte_registry, target_columns, target):
+            if result is not None:
+                result.append(row)
+            yield row
     except Exception as e:
-        result.append({'result_column': 'Error', 'source_table': 'Error', 'source_column': str(e)})
-    
-    return result
+        row = error_lineage_row(e)
+        if result is not None:
+            result.append(row)
+        yield row
+
+    if stats is not None:
+        stats.update(cte_memo_stats(cte_registry))
+        if incremental is not None:
+            stats.update(incremental.get('last_run', {}))
+    if cache is not None:
+        cache.put_rows(cache_key, result)
+
+WITH_ARG = 'with_' if 'with_' in exp.Select.arg_types else 'with'
+
+def split_statement_target(parsed):
+    # CREATE VIEW/TABLE ... AS <query> and INSERT INTO ... <query>: lineage is
+    # attributed to the target object, and an explicit column list renames the
+    # result columns by position
+    if not isinstance(parsed, (exp.Create, exp.Insert)):
+        return '', parsed, None
+    target = parsed.this
+    target_columns = None
+    if isinstance(target, exp.Schema):
+        target_columns = [col.name for col in target.expressions]
+        target = target.this
+    if isinstance(target, exp.Table):
+        name = '.'.join(part for part in (target.catalog, target.db, target.name) if part)
+    else:
+        name = target.sql() if target is not None else ''
+    query = parsed.expression
+    statement_with = get_with_clause(parsed)
+    if statement_with is not None and isinstance(query, exp.Query) and not query.ctes:
+        # WITH c AS (...) INSERT INTO t SELECT ... FROM c: sqlglot hangs the
+        # CTEs on the statement, so give the query a copy of them
+        query = query.copy()
+        query.set(WITH_ARG, statement_with.copy())
+    return name, query, target_columns
+
+def iter_query_rows(query_alias, query, cte_registry, target_columns=None, target=''):
+    # Rows are deduplicated across the whole statement (repeated aliases and
+    # target column renames can produce the same row more than once)
+    if query is None:
+        return
+    root = build_scopes(query_alias, query, cte_registry)
+    lineage = scope_lineage(query_alias, root, cte_registry)
+    seen = set()
+    for position, (col_alias, sources) in enumerate(lineage):
+        if target_columns and position < len(target_columns):
+            col_alias = target_columns[position]
+        col_alias = col_alias.strip()
+        for source_query, source_table, source_col in sources:
+            row = make_row(source_query, col_alias, source_table, source_col, target)
+            if row not in seen:
+                seen.add(row)
+                yield row
+
+def error_row(error):
+    return {'result_column': 'Error', 'source_table': 'Error', 'source_column': str(error)}
+
+def error_lineage_row(error):
+    return LineageRow('', 'Error', 'Error', str(error), '')
 
 #------------ Working Process CTEs------
-def process_ctes(parsed_ctes):
-    cte_registry = {}
+def process_ctes(parsed_ctes, incremental=None, scheduler=None):
+    # Registry is keyed by normalized CTE name. Each CTE is processed once, after
+    # all CTEs it reads from, so its 'memo' maps column -> fully resolved base
+    # sources and later references are plain lookups instead of re-traces.
+    # `incremental` is a dict the caller keeps between runs: entries whose own
+    # subtree and upstream CTEs are unchanged are reused from the previous run.
+    # `scheduler` (SQLSchedulerDS.CteScheduler) resolves the remaining CTEs
+    # on a process pool, independent branches of the DAG side by side.
+    definitions = {}
     for cte in parsed_ctes.find_all(exp.CTE):
-        cte_name = cte.alias
-        cte_query = cte.this
-        processed_cte = process_query(cte.alias, cte_query, cte_registry)
-        cte_registry[cte_name] = {
-            'columns': processed_cte['columns'],
-            'tables': processed_cte['tables']
-        }
+        definitions.setdefault(normalize_name(cte.alias), cte)
+    dependencies = {name: cte_dependencies(cte, definitions) for name, cte in definitions.items()}
+    order, cyclic = cte_dependency_order(dependencies)
+    rank = {name: position for position, name in enumerate(order)}
+
+    previous = incremental.get('ctes', {}) if incremental is not None else {}
+    fingerprints = {}
+    reused = 0
+
+    cte_registry = {}
+    jobs = []
+    upstream_masks = {}  # CTE -> bit set (by rank) of every CTE upstream of it
+    for cte_name in order:
+        cte = definitions[cte_name]
+        # Upstream CTEs resolved before this one: all of them but back edges
+        upstream = [dep for dep in dependencies[cte_name] if rank[dep] < rank[cte_name]]
+        mask = 0
+        for dep in upstream:
+            mask |= upstream_masks[dep] | (1 << rank[dep])
+        upstream_masks[cte_name] = mask
+        fingerprint = None
+        if incremental is not None:
+            fingerprint = cte_fingerprint(cte, [fingerprints.get(dep) for dep in dependencies[cte_name]])
+            fingerprints[cte_name] = fingerprint
+            entry = previous.get(fingerprint)
+            if entry is not None:
+                entry.update(memo_hits=0, memo_saved=0)
+                cte_registry[cte_name] = entry
+                reused += 1
+                continue
+
+        cost = 1 + bin(mask).count('1')
+        job = (cte_name, cte, upstream, cte_name in cyclic, fingerprint, cost)
+        if scheduler is not None:
+            jobs.append(job)
+        else:
+            cte_registry[cte_name] = process_cte(*job[1:], cte_registry)
+
+    if jobs:
+        scheduler.resolve(jobs, cte_registry)
+        cte_registry = {name: cte_registry[name] for name in order}
+
+    if incremental is not None:
+        incremental['ctes'] = {entry['fingerprint']: entry for entry in cte_registry.values()}
+        incremental['last_run'] = {'cte_reused': reused, 'cte_recomputed': len(cte_registry) - reused}
     return cte_registry
 
+def process_cte(cte, upstream, cyclic, fingerprint, cost, cte_registry):
+    # cte_registry must hold every CTE of `upstream`
+    processed_cte = process_query(cte.alias, cte.this, cte_registry)
+    return {
+        'name': cte.alias,
+        'columns': processed_cte['columns'],
+        'tables': processed_cte['tables'],
+        'memo': {normalize_name(col): tuple(sources) for col, sources in processed_cte['columns'].items()},
+        # CTEs a re-trace would evaluate instead of a memo hit: this one and
+        # the distinct CTEs upstream of it
+        'cost': cost,
+        'cyclic': cyclic,
+        'memo_hits': 0,
+        'memo_saved': 0,
+        'fingerprint': fingerprint
+    }
+
+def cte_fingerprint(cte, upstream_fingerprints):
+    # Generated SQL is whitespace/comment independent; folding in the upstream
+    # fingerprints makes an edit invalidate every downstream dependent as well.
+    # The catalog changes how columns resolve, so it is part of the key too.
+    catalog = active_catalog.fingerprint if active_catalog is not None else ''
+    text = '\0'.join([cte.alias, cte.this.sql(comments=False), catalog] + [fp or '' for fp in upstream_fingerprints])
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+def cte_dependencies(cte, definitions):
+    deps = []
+    for table in cte.this.find_all(exp.Table):
+        name = normalize_name(table.name)
+        if not table.db and name in definitions and name not in deps:
+            deps.append(name)
+    return deps
+
+def cte_dependency_order(dependencies):
+    # Iterative depth-first topological sort; back edges (recursive or mutually
+    # dependent CTEs) are dropped and reported so the rest still resolves
+    order, state, cyclic = [], {}, set()
+    for root in dependencies:
+        if root in state:
+            continue
+        state[root] = 'visiting'
+        stack = [(root, iter(dependencies[root]))]
+        while stack:
+            name, deps = stack[-1]
+            for dep in deps:
+                if state.get(dep) == 'visiting':
+                    cyclic.update((name, dep))
+                elif dep not in state:
+                    state[dep] = 'visiting'
+                    stack.append((dep, iter(dependencies[dep])))
+                    break
+            else:
+                stack.pop()
+                state[name] = 'done'
+                order.append(name)
+    return order, cyclic
+
+def cte_memo_stats(cte_registry):
+    return {
+        'cte_count': len(cte_registry),
+        'cte_cycles': sorted(entry['name'] for entry in cte_registry.values() if entry['cyclic']),
+        'cte_memo_hits': sum(entry['memo_hits'] for entry in cte_registry.values()),
+        'cte_memo_saved': sum(entry['memo_saved'] for entry in cte_registry.values())
+    }
+
 def process_query(query_alias, query, cte_registry):
+    root = build_scopes(query_alias, query, cte_registry)
+    finish_scope(query_alias, root, cte_registry)
+    return root['result']
+
+#------------ Scopes------
+# A query is flattened into scopes (one per SELECT or set operation) resolved
+# from an explicit work stack rather than by recursion, so nesting depth is
+# bounded by memory only and each scope is processed exactly once. Derived
+# tables (FROM/JOIN subqueries) are resolved before the scope reading them;
+# nested subqueries (IN, EXISTS, scalar) after its tables, as they may
+# correlate with them.
+SET_OPERATION = getattr(exp, 'SetOperation', exp.Union)
+SCOPE_NODES = (exp.Subquery, exp.Select, SET_OPERATION)
+
+def new_scope(node, parent):
+    # parent: enclosing scope whose tables correlated references may use
+    while isinstance(node, exp.Subquery):
+        node = node.this
+    return {'node': node, 'parent': parent, 'derived': {}, 'nested': {}, 'branches': [],
+            'tables': [], 'index': None, 'output': None, 'result': None}
+
+def build_scopes(query_alias, query, cte_registry):
+    # Resolves every scope of `query` but the root's own select list, which
+    # the caller traces (iter_query_rows streams it). Each scope is popped
+    # three times: find its subqueries, build its tables once its derived
+    # tables are resolved, trace its columns once its nested subqueries are.
+    root = new_scope(query, None)
+    stack = [(root, 0)]
+    while stack:
+        scope, step = stack.pop()
+        if step == 0:
+            stack.append((scope, 1))
+            stack.extend((child, 0) for child in reversed(discover_scopes(scope)))
+        elif step == 1:
+            scope['tables'], scope['index'] = build_query_scope(query_alias, scope, cte_registry)
+            stack.append((scope, 2))
+            stack.extend((child, 0) for child in reversed(list(scope['nested'].values())))
+        elif scope is not root:
+            finish_scope(query_alias, scope, cte_registry)
+    return root
+
+def discover_scopes(scope):
+    # Registers the child scopes of one scope; returns the ones that must be
+    # resolved before its tables (derived tables, set operation branches)
+    node = scope['node']
+    if isinstance(node, SET_OPERATION):
+        scope['branches'] = [new_scope(node.this, scope['parent']), new_scope(node.expression, scope['parent'])]
+        return scope['branches']
+    if not isinstance(node, exp.Select):
+        return []
+
+    from_clause = get_from_clause(node)
+    sources = [from_clause.this] if from_clause else []
+    sources.extend(join.this for join in node.args.get('joins') or ())
+    for source in sources:
+        if isinstance(source, exp.Subquery):
+            scope['derived'][id(source)] = new_scope(source, scope['parent'])
+
+    # Anything else that is a query is a nested subquery; CTE bodies have
+    # their own entries in the registry
+    stack = list(node.iter_expressions())
+    while stack:
+        child = stack.pop()
+        if id(child) in scope['derived'] or isinstance(child, exp.With):
+            continue
+        if isinstance(child, SCOPE_NODES):
+            scope['nested'][id(child)] = new_scope(child, scope)
+            continue
+        stack.extend(child.iter_expressions())
+    return list(scope['derived'].values())
+
+def finish_scope(query_alias, scope, cte_registry):
+    # Repeated output names (e.g. a.id and b.id, or * over several tables) keep
+    # the sources of all of them
+    scope['output'] = list(scope_lineage(query_alias, scope, cte_registry))
+    merged = {}
+    for alias, sources in scope['output']:
+        merged.setdefault(alias, {}).update(dict.fromkeys(sources))
+    select_columns = {alias: list(sources) for alias, sources in merged.items()}
+    scope['result'] = {'columns': select_columns, 'tables': scope['tables'], 'index': scope['index']}
+
+def scope_lineage(query_alias, scope, cte_registry):
+    # (alias, sources) per output column of a scope whose children are resolved
+    node = scope['node']
+    if not isinstance(node, SET_OPERATION):
+        yield from iter_select_lineage(query_alias, node, scope['index'], cte_registry, scope['nested'])
+        return
+    # Column n of a UNION reads column n of both branches; INTERSECT/EXCEPT
+    # return rows of the first branch only. Names come from the first branch.
+    first, second = scope['branches']
+    for position, (alias, sources) in enumerate(first['output']):
+        if isinstance(node, exp.Union) and position < len(second['output']):
+            sources = list(dict.fromkeys(sources + second['output'][position][1]))
+        yield alias, sources
+
+def build_query_scope(query_alias, scope, cte_registry):
+    profiler = active_profiler
+    started = perf_counter() if profiler is not None else 0
+    query = scope['node']
+    derived = scope['derived']
     tables = []
     
-    # Process FROM clause recursively
+    # Process FROM clause; derived tables are already resolved
     if isinstance(query, exp.Select):
-        from_clause = query.args.get("from")
+        from_clause = get_from_clause(query)
         if from_clause:
             from_expressions = []
             
@@ -65,7 +414,7 @@ def process_query(query_alias, query, cte_registry):
                 from_expressions.append(from_clause.this)
             
             for expr in from_expressions:
-                processed = process_from_expression(query_alias, expr, cte_registry)
+                processed = process_from_expression(query_alias, expr, cte_registry, derived)
                 if processed:
                     if isinstance(processed, list):
                         tables.extend(processed)
@@ -78,68 +427,118 @@ def process_query(query_alias, query, cte_registry):
     joins = query.args.get("joins")
     if joins:
         for join_clause in joins:
-            join_tables = process_join(query_alias, join_clause, cte_registry)
+            join_tables = process_join(query_alias, join_clause, cte_registry, derived)
             if join_tables:
                 if isinstance(join_tables, list):
                     tables.extend(join_tables)
                 else:
                     tables.append(join_tables)
 
-    # Process SELECT expressions with deep analysis
-    select_columns = {}
-    if isinstance(query, exp.Select):
-        for expr in query.selects:
-            alias = get_alias(expr)
-            columns = []
-            
-            # Process all column references
-            column_refs = expr.find_all(exp.Column)
-            for column in column_refs:
-                sources = trace_column_source(query_alias, column, tables, cte_registry)
-                if sources:
-                    columns.extend(sources)
-            
-            # Handle calculated expressions
-            if isinstance(expr, (exp.Mul, exp.Add, exp.Sub, exp.Div)):
-                for arg in expr.find_all(exp.Column):
-                    sources = trace_column_source(query_alias, arg, tables, cte_registry)
-                    if sources:
-                        columns.extend(sources)
-            
-            select_columns[alias] = columns
+    # Normalize aliases/sources once per scope instead of once per column reference
+    scope_index = build_scope_index(query_alias, tables)
+    scope_index['parent'] = scope['parent']['index'] if scope['parent'] is not None else None
+    if profiler is not None:
+        profiler.add_time('from_join', started)
+        profiler.count('scopes')
+        profiler.count('tables_registered', len(tables))
+        profiler.maximum('max_tables_per_scope', len(tables))
+    return tables, scope_index
 
-    return {'columns': select_columns, 'tables': tables}
+def iter_select_lineage(query_alias, query, scope_index, cte_registry, nested=None):
+    # Process SELECT expressions with deep analysis, one (alias, sources) at a time
+    if not isinstance(query, exp.Select):
+        return
+    profiler = active_profiler
+    for expr in query.selects:
+        star = get_star(expr)
+        if star is not None:
+            yield from expand_star(query_alias, expr, star, scope_index)
+            continue
+        alias = get_alias(expr)
+        columns = []
+        seen = set()
+        subqueries = []
+        for column in collect_column_refs(expr, nested, subqueries):
+            if profiler is None:
+                sources = trace_column_source(query_alias, column, scope_index, cte_registry)
+            else:
+                started = perf_counter()
+                sources = trace_column_source(query_alias, column, scope_index, cte_registry)
+                profiler.add_time('trace_column_source', started)
+            for source in sources:
+                if source not in seen:
+                    seen.add(source)
+                    columns.append(source)
+        # A scalar subquery contributes whatever it selects
+        for subquery in subqueries:
+            for _, sources in subquery['output']:
+                for source in sources:
+                    if source not in seen:
+                        seen.add(source)
+                        columns.append(source)
+        yield alias, columns
 
-def process_from_expression(query_alias, expr, cte_registry):
+def expand_star(query_alias, expr, star, scope_index):
+    # SELECT * / t.*: one output column per column the source exposes. Plain
+    # tables need the catalog for that; without it (or for tables it doesn't
+    # know) they keep a single '*' column.
+    excluded = {normalize_name(col.name) for col in star.args.get('except') or star.args.get('except_') or ()}
+    qualifier = normalize_name(expr.table) if isinstance(expr, exp.Column) else ''
+    if qualifier:
+        entries = scope_index['aliases'].get(qualifier) or scope_index['sources'].get(qualifier, ())
+    else:
+        entries = scope_index['star']
+    for table in entries:
+        if table['source_type'] != 'table':
+            for name, sources in table['columns'].items():
+                if normalize_name(name) not in excluded:
+                    yield name, list(sources)
+            continue
+        columns = active_catalog.columns(table['source']) if active_catalog is not None else None
+        if not columns:
+            yield '*', [(query_alias, table['source'], '*')]
+            continue
+        if active_profiler is not None:
+            active_profiler.count('star_expanded', len(columns))
+        for name in columns:
+            if normalize_name(name) not in excluded:
+                yield name, [(query_alias, table['source'], intern(name))]
+
+def process_from_expression(query_alias, expr, cte_registry, derived):
     if isinstance(expr, exp.Table):
-        return process_table(query_alias, expr)
+        return process_table(query_alias, expr, cte_registry)
     elif isinstance(expr, exp.Join):
-        return process_join(expr, cte_registry)
+        return process_join(query_alias, expr, cte_registry, derived)
     elif isinstance(expr, exp.Subquery):
-        return process_subquery(query_alias, expr, cte_registry)
+        return process_subquery(query_alias, expr, derived)
     elif isinstance(expr, exp.Identifier):
         return process_cte_reference(expr, cte_registry)
     return None
 
-def process_table(query_alias, table_expr):
+def process_table(query_alias, table_expr, cte_registry=None):
+    if cte_registry and not table_expr.db:
+        cte = cte_registry.get(normalize_name(table_expr.name))
+        if cte is not None:
+            return cte_entry(query_alias, table_expr.alias_or_name, cte)
     return {
         'query_alias': query_alias,
         'alias': table_expr.alias_or_name,
         'source_type': 'table',
-        'source': table_expr.name,
+        'source': intern(table_expr.name),
         'columns': {}
     }
 
-def process_join(join_alias, join_expr, cte_registry):
+def process_join(join_alias, join_expr, cte_registry, derived):
     if isinstance(join_expr.this, exp.Table):
-        return process_table(join_alias, join_expr.this)
+        return process_table(join_alias, join_expr.this, cte_registry)
     elif isinstance(join_expr.this, exp.Subquery):
-        return process_subquery(join_alias, join_expr.this, cte_registry)
+        return process_subquery(join_alias, join_expr.this, derived)
     return None
 
-def process_subquery(query_alias, subq_expr, cte_registry):
+def process_subquery(query_alias, subq_expr, derived):
+    # derived: id(subquery node) -> its scope, resolved by build_scopes
     alias = subq_expr.alias
-    processed = process_query(query_alias, subq_expr.this, cte_registry)
+    processed = derived[id(subq_expr)]['result']
     return {
         'query_alias': query_alias,
         'alias': alias,
@@ -149,65 +548,150 @@ def process_subquery(query_alias, subq_expr, cte_registry):
     }
 
 def process_cte_reference(ident_expr, cte_registry):
-    cte_name = ident_expr.name
-    alias = ident_expr.alias_or_name
-    cte = cte_registry.get(cte_name, {'columns': {}, 'tables': []})
+    cte = cte_registry.get(normalize_name(ident_expr.name))
+    if cte is None:
+        return None
+    return cte_entry(None, ident_expr.alias_or_name, cte)
+
+def cte_entry(query_alias, alias, cte):
     return {
+        'query_alias': query_alias,
         'alias': alias,
         'source_type': 'cte',
-        'source': cte,
-        'columns': cte['columns']
+        'source': cte['name'],
+        'columns': cte['columns'],
+        'cte': cte
     }
-## Work On This for Subquery and CTE
-def trace_column_source(query_alias, column, tables, cte_registry, visited=None):
-    visited = visited or set()
 
-    table_alias = column.table
-    col_name = column.name
-    sources = []
-    
-    target_alias = (table_alias or '').strip().lower()
+def normalize_name(name):
+    return (name or '').strip().lower()
 
+def build_scope_index(query_alias, tables):
+    # aliases/sources: qualified lookups; unqualified: secondary index used when
+    # a column has no table prefix (plain tables of this scope plus derived
+    # sources, which only answer for columns they actually expose); star: what
+    # SELECT * expands to. With a catalog, the tables it knows move from
+    # unqualified to catalog_tables and answer only for their own columns.
+    index = {'aliases': {}, 'sources': {}, 'unqualified': [], 'star': [],
+             'catalog_tables': [], 'owners': {}}
     for table in tables:
-        current_alias = (table.get('alias', '') or '').strip().lower()
-        current_source = (table.get('source', '') or '').strip().lower()
-        
-        # if current_alias != target_alias and current_source != target_alias:
-        #     continue
+        alias = normalize_name(table.get('alias'))
+        if alias:
+            index['aliases'].setdefault(alias, []).append(table)
+        if isinstance(table.get('source'), str):
+            source = normalize_name(table['source'])
+            if source and source != alias:
+                index['sources'].setdefault(source, []).append(table)
+        if table['source_type'] == 'table':
+            if table.get('query_alias') == query_alias:
+                index['star'].append(table)
+                if active_catalog is not None and active_catalog.knows(table['source']):
+                    index['catalog_tables'].append((normalize_name(table['source']), table))
+                else:
+                    index['unqualified'].append(table)
+            continue
+        if table['source_type'] == 'cte':
+            table['column_index'] = table['cte']['memo']
+        else:
+            table['column_index'] = {normalize_name(name): sources
+                                     for name, sources in table['columns'].items()}
+        index['unqualified'].append(table)
+        index['star'].append(table)
+    return index
+
+def catalog_owners(scope_index, col_key):
+    # Catalog tables of this scope that have the column, memoized per scope.
+    # If none of them does and no other plain table could (stale catalog, or a
+    # select-list alias) they all stay candidates rather than dropping lineage.
+    owners = scope_index['owners'].get(col_key)
+    if owners is None:
+        tables = active_catalog.column_tables.get(col_key, ())
+        owners = [table for key, table in scope_index['catalog_tables'] if key in tables]
+        if not owners and not any(table['source_type'] == 'table' for table in scope_index['unqualified']):
+            owners = [table for _, table in scope_index['catalog_tables']]
+        scope_index['owners'][col_key] = owners
+    return owners
+
+def trace_column_source(query_alias, column, scope_index, cte_registry, visited=None):
+    col_name = intern(column.name)
+    target_alias = normalize_name(column.table)
 
+    # A correlated subquery resolves what its own tables don't answer in the
+    # enclosing scopes, innermost first
+    while True:
+        if target_alias:
+            matches = scope_index['aliases'].get(target_alias) or scope_index['sources'].get(target_alias, ())
+        elif scope_index['catalog_tables']:
+            matches = catalog_owners(scope_index, normalize_name(col_name)) + scope_index['unqualified']
+        else:
+            matches = scope_index['unqualified']
+        if matches or scope_index.get('parent') is None:
+            break
+        scope_index = scope_index['parent']
+
+    sources = []
+    for table in matches:
         if table['source_type'] == 'table':
-            if     current_alias == target_alias \
-                or current_source == target_alias \
-                or target_alias == '' and query_alias == table['query_alias']:
-                sources.append((query_alias, table['source'], col_name))
-
-        # elif table['source_type'] in ('subquery'):
-        #   #  if (table['source'], col_name) in visited:
-        #     # if (table['source'], col_name) in visited:
-        #     #     continue
-        #     # visited.add((table['source'], col_name))
-            
-        #     # Recursive resolution for CTEs/subqueries
-        #     if col_name in table['source']['columns']:
-        #         for src_table, src_col in table['source']['columns'][col_name]:
-        #             if src_table == 'Error':
-        #                 continue
-        #             # Trace through nested structures
-        #             sources.extend(
-        #                 trace_column_source(
-        #                     exp.Column(**{'this': src_col, 'table': None}),
-        #                     table['source']['tables'],
-        #                     cte_registry,
-        #                     visited
-        #                 )
-        #             )
-        elif table['source_type'] == 'cte':
-             cte = cte_registry.get(table['source']['source'], {})
-             if col_name in cte.get('columns', {}):
-                 sources.extend(cte['columns'][col_name])
+            sources.append((query_alias, table['source'], col_name))
+            continue
+
+        # subquery / cte: reuse the sources already resolved inside it
+        resolved = table['column_index'].get(normalize_name(col_name))
+        if not resolved and '*' in table['column_index']:
+            # Derived source selected * from a table the catalog doesn't know
+            resolved = [(source_query, source_table, col_name)
+                        for source_query, source_table, source_col in table['column_index']['*']
+                        if source_col == '*']
+        if resolved:
+            sources.extend(resolved)
+            if table['source_type'] == 'cte':
+                table['cte']['memo_hits'] += 1
+                table['cte']['memo_saved'] += table['cte']['cost']
+        if table['source_type'] == 'cte' and active_profiler is not None:
+            active_profiler.count('cte_lookups')
 
     return sources
 
+def collect_column_refs(expr, nested=None, subqueries=None):
+    # Single iterative walk over one select expression (function args, CASE
+    # branches, window specs, arithmetic); each distinct column is kept once.
+    # Nested subqueries (keys of `nested`) are their own scopes: the walk stops
+    # there and appends the scope to `subqueries` instead.
+    refs = []
+    seen = set()
+    stack = [expr]
+    while stack:
+        node = stack.pop()
+        if nested and id(node) in nested:
+            subqueries.append(nested[id(node)])
+            continue
+        if isinstance(node, exp.Column):
+            key = (normalize_name(node.table), normalize_name(node.name))
+            if key not in seen:
+                seen.add(key)
+                refs.append(node)
+            continue
+        children = list(node.iter_expressions())
+        children.reverse()
+        stack.extend(children)
+    return refs
+
+def get_star(expr):
+    # The Star node of a `*` or `t.*` select item, else None
+    if isinstance(expr, exp.Star):
+        return expr
+    if isinstance(expr, exp.Column) and isinstance(expr.this, exp.Star):
+        return expr.this
+    return None
+
+def get_from_clause(query):
+    # sqlglot renamed the FROM arg from "from" to "from_" in later releases
+    return query.args.get("from") or query.args.get("from_")
+
+def get_with_clause(node):
+    # Renamed from "with" to "with_" along with "from"
+    return node.args.get("with") or node.args.get("with_")
+
 def get_alias(expr):
     if isinstance(expr, exp.Alias):
         return expr.alias
@@ -217,32 +701,7 @@ def get_alias(expr):
         return expr.sql()
     return expr.sql()
 
-# GUI Implementation
-def analyze_sql():
-    sql_input = input_text.get("1.0", tk.END).strip()
-    result = process_sql(sql_input)
-    csv_output = "RESULT COLUMN,SOURCE TABLE,SOURCE COLUMN\n"
-    for row in result:
-        csv_output += f"{row['result_query']},{row['result_column']},{row['source_table']},{row['source_column']}\n"
-    output_text.delete("1.0", tk.END)
-    output_text.insert(tk.END, csv_output)
-
-root = tk.Tk()
-root.title("SQL Parser Analyzer")
-
-input_label = ttk.Label(root, text="Enter SQL Statement:")
-input_label.grid(row=0, column=0, padx=10, pady=5, sticky='w')
-
-input_text = scrolledtext.ScrolledText(root, width=80, height=20)
-input_text.grid(row=1, column=0, padx=10, pady=5)
-
-analyze_button = ttk.Button(root, text="Analyze", command=analyze_sql)
-analyze_button.grid(row=2, column=0, padx=10, pady=5)
-
-output_label = ttk.Label(root, text="Result:")
-output_label.grid(row=3, column=0, padx=10, pady=5, sticky='w')
-
-output_text = scrolledtext.ScrolledText(root, width=80, height=20)
-output_text.grid(row=4, column=0, padx=10, pady=5)
 
-root.mainloop()
\ No newline at end of file
+if __name__ == "__main__":
+    from SQLGuiDS import main
+    main()
@@ -50,10 +50,12 @@ def process_query(query, cte_registry):
     
     # Process FROM clause
     if isinstance(query, exp.Select):
-        from_clause = query.args.get("from")
+        # Later sqlglot releases renamed "from" to "from_" and hold the one
+        # FROM source in `this`
+        from_clause = query.args.get("from") or query.args.get("from_")
         if from_clause:
             # Handle JOINs and tables
-            for expr in from_clause.expressions:
+            for expr in from_clause.expressions or [from_clause.this]:
                 if isinstance(expr, exp.Table):
                     tables.append({
                         'alias': expr.alias_or_name,
@@ -120,22 +122,28 @@ def analyze_sql():
     output_text.delete("1.0", tk.END)
     output_text.insert(tk.END, csv_output)
 
-root = tk.Tk()
-root.title("SQL Parser Analyzer")
+def main():
+    global input_text, output_text
 
-input_label = ttk.Label(root, text="Enter SQL Statement:")
-input_label.grid(row=0, column=0, padx=10, pady=5, sticky='w')
+    root = tk.Tk()
+    root.title("SQL Parser Analyzer")
 
-input_text = scrolledtext.ScrolledText(root, width=80, height=20)
-input_text.grid(row=1, column=0, padx=10, pady=5)
+    input_label = ttk.Label(root, text="Enter SQL Statement:")
+    input_label.grid(row=0, column=0, padx=10, pady=5, sticky='w')
 
-analyze_button = ttk.Button(root, text="Analyze", command=analyze_sql)
-analyze_button.grid(row=2, column=0, padx=10, pady=5)
+    input_text = scrolledtext.ScrolledText(root, width=80, height=20)
+    input_text.grid(row=1, column=0, padx=10, pady=5)
 
-output_label = ttk.Label(root, text="Result:")
-output_label.grid(row=3, column=0, padx=10, pady=5, sticky='w')
+    analyze_button = ttk.Button(root, text="Analyze", command=analyze_sql)
+    analyze_button.grid(row=2, column=0, padx=10, pady=5)
 
-output_text = scrolledtext.ScrolledText(root, width=80, height=20)
-output_text.grid(row=4, column=0, padx=10, pady=5)
+    output_label = ttk.Label(root, text="Result:")
+    output_label.grid(row=3, column=0, padx=10, pady=5, sticky='w')
 
-root.mainloop()
\ No newline at end of file
+    output_text = scrolledtext.ScrolledText(root, width=80, height=20)
+    output_text.grid(row=4, column=0, padx=10, pady=5)
+
+    root.mainloop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+import argparse
+import glob
+import io
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from SQLAnalyzerDS import error_row
+from SQLCacheDS import LineageCache
+from SQLCatalogDS import load_catalog
+from SQLDialectDS import CANDIDATE_DIALECTS, DialectDetector, backslash_escapes, dialect_key
+from SQLExportDS import FILE_FORMATS, FORMATS, check_export_args, export_rows, open_output, write_rows
+from SQLGuardDS import QUARANTINE_FIELDS, StatementGuard
+from SQLProfileDS import Profiler, write_report
+import SQLScriptDS
+from SQLScriptDS import (SCRIPT_FIELDS, init_worker, iter_script_lineage, make_dialect, merge_report,
+                         worker_report)
+from SQLTablesDS import TABLE_FIELDS, iter_script_dependencies
+
+BATCH_FIELDS = ('source_file',) + SCRIPT_FIELDS
+BATCH_TABLE_FIELDS = ('source_file',) + TABLE_FIELDS
+FILE_KEY = 'file:'  # cache key variant prefix of whole-file results
+# Files larger than this are never held in memory whole: run_batch streams
+# them statement by statement instead of caching or analyzing the whole file
+LARGE_FILE_BYTES = 16 * 1024 * 1024
+
+def collect_sql_files(paths, pattern='*.sql'):
+    # Accepts directories (searched recursively), glob patterns and plain files
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(glob.glob(os.path.join(path, '**', pattern), recursive=True))
+        else:
+            files.extend(glob.glob(path, recursive=True))
+    return sorted(set(files))
+
+def read_sql_file(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+def file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+def iter_stream_rows(path, stream, profiler=None, tables_only=False):
+    # tables_only: table-level dependencies from the token scanner instead of
+    # column lineage. A detected dialect is remembered per file and directory.
+    dialect = SQLScriptDS.worker_dialect
+    if tables_only:
+        return iter_script_dependencies(stream, escapes=backslash_escapes(dialect))
+    if isinstance(dialect, DialectDetector):
+        dialect.use_source(path, os.path.dirname(path))
+    return iter_script_lineage(stream, dialect, profiler=profiler, catalog=SQLScriptDS.worker_catalog)
+
+def analyze_file(path, profile=False, tables_only=False):
+    # Files may hold several statements; each is attributed to its target object.
+    # Returns (path, rows, report or None), the report holding the profile
+    # and dialect detection counters
+    profiler = Profiler() if profile else None
+    try:
+        with open(path, encoding='utf-8') as f:
+            rows = list(iter_stream_rows(path, f, profiler, tables_only))
+    except OSError as e:
+        rows = [error_row(e)]
+    return path, rows, worker_report(profiler)
+
+def analyze_text(item, profile=False, tables_only=False):
+    path, sql = item
+    profiler = Profiler() if profile else None
+    rows = list(iter_stream_rows(path, io.StringIO(sql), profiler, tables_only))
+    return path, rows, worker_report(profiler)
+
+def run_batch(files, workers=None, cache=None, profiler=None, catalog=None, tables_only=False,
+              dialect="snowflake", guard=None):
+    # Yields (path, rows); workers=1 keeps everything in-process. Worker
+    # reports are merged into `profiler` (and a DialectDetector `dialect`) as
+    # results arrive. The catalog and dialect are handed to each worker once.
+    # With a StatementGuard every statement runs under its budgets instead.
+    # Files over LARGE_FILE_BYTES come last; their rows are a generator over
+    # the file, to be consumed before the next result is taken.
+    large = {path for path in files if file_size(path) > LARGE_FILE_BYTES}
+    yield from run_files([path for path in files if path not in large], workers, cache, profiler, catalog,
+                         tables_only, dialect, guard)
+    for path in files:
+        if path in large:
+            yield path, iter_large_file(path, workers, cache, profiler, catalog, tables_only, dialect, guard)
+
+def iter_large_file(path, workers=None, cache=None, profiler=None, catalog=None, tables_only=False,
+                    dialect="snowflake", guard=None):
+    # Memory follows the largest statement, not the file. There is no
+    # whole-file cache entry: with a cache, statements are cached one by one
+    # (guarded statements are not cached).
+    if guard is not None:
+        for rows, report in guard.iter_file(path, catalog, dialect, profiler is not None, tables_only):
+            merge_report(report, profiler, dialect)
+            yield from rows
+        return
+    if isinstance(dialect, DialectDetector):
+        dialect.use_source(path, os.path.dirname(path))
+    try:
+        stream = open(path, encoding='utf-8')
+    except OSError as e:
+        yield error_row(e)
+        return
+    with stream:
+        if tables_only:
+            yield from iter_script_dependencies(stream, escapes=backslash_escapes(dialect))
+        else:
+            yield from iter_script_lineage(stream, dialect, cache, workers, profiler=profiler, catalog=catalog)
+
+def run_files(files, workers=None, cache=None, profiler=None, catalog=None, tables_only=False,
+              dialect="snowflake", guard=None):
+    profile = profiler is not None
+    if cache is None:
+        if guard is not None:
+            results = guard.map(files, catalog, dialect, profile, tables_only)
+        else:
+            results = map_files(partial(analyze_file, profile=profile, tables_only=tables_only), files, workers,
+                                catalog, dialect)
+        for path, rows, report in results:
+            merge_report(report, profiler, dialect)
+            yield path, rows
+        return
+
+    # Cache lookups happen here in the parent so only misses reach the pool;
+    # hits are yielded first, misses as they finish
+    misses = []
+    for path in files:
+        try:
+            sql = read_sql_file(path)
+        except OSError as e:
+            yield path, [error_row(e)]
+            continue
+        # Whole-file rows (source-file dict rows) live in their own key space:
+        # the same text as a single statement is cached by lineage_rows as LineageRow tuples
+        if tables_only:
+            key = cache.make_key(sql, None, f'{FILE_KEY}tables')
+        else:
+            key = cache.make_key(sql, dialect_key(dialect),
+                                 FILE_KEY + (catalog.fingerprint if catalog is not None else ''))
+        rows = cache.get_rows(key)
+        if profile:
+            profiler.count('cache_hits' if rows is not None else 'cache_misses')
+        if rows is not None:
+            yield path, rows
+        else:
+            misses.append((path, sql, key))
+
+    keys = {path: key for path, _, key in misses}
+    items = [(path, sql) for path, sql, _ in misses]
+    if guard is not None:
+        results = guard.map(items, catalog, dialect, profile, tables_only)
+    else:
+        results = map_files(partial(analyze_text, profile=profile, tables_only=tables_only), items, workers,
+                            catalog, dialect)
+    for path, rows, report in results:
+        merge_report(report, profiler, dialect)
+        # Quarantined statements are analyzed again next run, not served from the cache
+        if guard is None or path not in guard.quarantined_files:
+            cache.put_rows(keys[path], rows)
+        yield path, rows
+    cache.flush()
+
+def map_files(func, items, workers=None, catalog=None, dialect="snowflake"):
+    if workers == 1 or len(items) <= 1:
+        init_worker(catalog, dialect)
+        yield from map(func, items)
+        return
+    chunksize = max(1, len(items) // ((workers or os.cpu_count() or 1) * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(catalog, dialect)) as executor:
+        yield from executor.map(func, items, chunksize=chunksize)
+
+def iter_batch_rows(results):
+    for path, rows in results:
+        for row in rows:
+            yield dict(row, source_file=path)
+
+def iter_stdin_rows(cache=None, profiler=None, catalog=None, tables_only=False, dialect="snowflake"):
+    # stdin is split and streamed statement by statement as it is read
+    if tables_only:
+        rows = iter_script_dependencies(sys.stdin, escapes=backslash_escapes(dialect))
+    else:
+        rows = iter_script_lineage(sys.stdin, dialect, cache, profiler=profiler, catalog=catalog)
+    for row in rows:
+        yield dict(row, source_file='-')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch SQL lineage analyzer")
+    parser.add_argument('paths', nargs='+', help="directories, glob patterns or .sql files ('-' reads stdin)")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="number of worker processes (default: CPU count)")
+    parser.add_argument('-o', '--output', help="output file (default: stdout)")
+    parser.add_argument('-f', '--format', choices=FORMATS + FILE_FORMATS, default='csv',
+                        help="output format (sqlite/parquet/arrow need -o)")
+    parser.add_argument('--pattern', default='*.sql', help="file pattern used inside directories")
+    parser.add_argument('--dialect', default='snowflake', help="sqlglot dialect, or 'auto' to detect it per file")
+    parser.add_argument('--dialects', default=','.join(CANDIDATE_DIALECTS),
+                        help="comma-separated candidates tried by --dialect auto")
+    parser.add_argument('--cache', help="SQLite file that keeps lineage between runs")
+    parser.add_argument('--cache-entries', type=int, default=4096, help="in-memory cache entry limit")
+    parser.add_argument('--catalog', help="information_schema columns export (CSV or JSON) used to "
+                                          "resolve unqualified columns and expand *")
+    parser.add_argument('--tables-only', action='store_true',
+                        help="only table-level dependencies (CTE -> table edges), from a fast token scan")
+    parser.add_argument('--statement-timeout', type=float, metavar='SECONDS',
+                        help="wall-time budget per statement; offenders are killed, quarantined and retried "
+                             "table-only")
+    parser.add_argument('--statement-memory', type=int, metavar='MB',
+                        help="memory budget per statement (analyzer process resident set)")
+    parser.add_argument('--quarantine', metavar='PATH',
+                        help="write the statements that exceeded a budget, with their fingerprints (CSV)")
+    parser.add_argument('--profile', nargs='?', const='-', metavar='PATH',
+                        help="write a per-phase JSON profile to PATH (default: stderr)")
+    args = parser.parse_args(argv)
+    check_export_args(parser, args.format, args.output)
+    guarded = args.statement_timeout is not None or args.statement_memory is not None or args.quarantine
+    if args.paths == ['-'] and (guarded or args.quarantine):
+        parser.error("statement budgets apply to files, not stdin")
+
+    files = [] if args.paths == ['-'] else collect_sql_files(args.paths, args.pattern)
+    if not files and args.paths != ['-']:
+        parser.error("no SQL files found")
+
+    catalog = load_catalog(args.catalog) if args.catalog else None
+    dialect = make_dialect(args.dialect, args.dialects.split(','))
+    cache = LineageCache(max_entries=args.cache_entries, path=args.cache) if args.cache else None
+    profiler = Profiler() if args.profile else None
+    guard = StatementGuard(args.statement_timeout, args.statement_memory, args.workers) if guarded else None
+    if files:
+        rows = iter_batch_rows(run_batch(files, args.workers, cache, profiler, catalog, args.tables_only, dialect,
+                                         guard))
+    else:
+        if isinstance(dialect, DialectDetector):
+            dialect.use_source('-')
+        rows = iter_stdin_rows(cache, profiler, catalog, args.tables_only, dialect)
+    try:
+        export_rows(rows, args.output, args.format, BATCH_TABLE_FIELDS if args.tables_only else BATCH_FIELDS)
+        if profiler is not None:
+            write_report(profiler.report(), args.profile)
+        if isinstance(dialect, DialectDetector) and not args.tables_only:
+            print(f"dialects: {dialect.stats()}", file=sys.stderr)
+        if guard is not None:
+            print(f"guard: {guard.stats()}", file=sys.stderr)
+        if guard is not None and args.quarantine:
+            with open_output(args.quarantine) as out:
+                write_rows(guard.quarantine, out, 'csv', QUARANTINE_FIELDS)
+    finally:
+        if cache is not None:
+            print(f"cache: {cache.stats()}", file=sys.stderr)
+            cache.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
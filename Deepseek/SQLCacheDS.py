@@ -0,0 +1,137 @@
+import hashlib
+import json
+import sqlite3
+import sys
+from collections import OrderedDict
+
+from SQLDialectDS import parse_sql
+
+# Bump whenever the analyzer output changes so stale on-disk rows are ignored
+CACHE_VERSION = 8
+
+def normalize_sql(sql):
+    return ' '.join(sql.split())
+
+def make_key(sql, dialect, variant=''):
+    # variant separates results of the same SQL under different settings,
+    # e.g. the schema catalog fingerprint
+    text = f"{CACHE_VERSION}\0{dialect or ''}\0{variant}\0{normalize_sql(sql)}"
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+def estimate_rows_size(rows):
+    # Rows are dicts or compact tuples (LineageRow); interned strings shared
+    # between rows are counted per row, so this is an upper bound
+    size = sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row)
+        for value in (row.values() if isinstance(row, dict) else row):
+            size += sys.getsizeof(value)
+    return size
+
+def copy_rows(rows):
+    # Dict rows are copied so callers can't mutate cached entries; tuples are immutable
+    return [dict(row) if isinstance(row, dict) else row for row in rows]
+
+class LineageCache:
+    """LRU of parsed ASTs and lineage rows keyed by normalized SQL + dialect,
+    optionally backed by a SQLite file so rows survive restarts."""
+
+    AST_BYTES_PER_CHAR = 40  # rough in-memory size of a sqlglot AST per SQL character
+
+    def __init__(self, max_entries=1024, max_bytes=256 * 1024 * 1024, path=None, commit_every=200):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> {'ast', 'rows', 'ast_size', 'rows_size', 'size'}
+        self.total_bytes = 0
+        self.commit_every = commit_every
+        self.pending_writes = 0
+        self.counters = {'hits': 0, 'misses': 0, 'disk_hits': 0,
+                         'ast_hits': 0, 'ast_misses': 0, 'evictions': 0}
+        self.db = None
+        if path:
+            self.db = sqlite3.connect(path)
+            self.db.execute("CREATE TABLE IF NOT EXISTS lineage (key TEXT PRIMARY KEY, rows TEXT NOT NULL)")
+            self.db.commit()
+
+    make_key = staticmethod(make_key)
+
+    def get_rows(self, key):
+        entry = self.entries.get(key)
+        if entry is not None and entry['rows'] is not None:
+            self.entries.move_to_end(key)
+            self.counters['hits'] += 1
+            return copy_rows(entry['rows'])
+        if self.db is not None:
+            found = self.db.execute("SELECT rows FROM lineage WHERE key = ?", (key,)).fetchone()
+            if found:
+                rows = json.loads(found[0])
+                self.counters['hits'] += 1
+                self.counters['disk_hits'] += 1
+                self._store(key, rows=rows)
+                return copy_rows(rows)
+        self.counters['misses'] += 1
+        return None
+
+    def put_rows(self, key, rows):
+        self._store(key, rows=copy_rows(rows))
+        if self.db is not None:
+            self.db.execute("INSERT OR REPLACE INTO lineage (key, rows) VALUES (?, ?)", (key, json.dumps(rows)))
+            self.pending_writes += 1
+            if self.pending_writes >= self.commit_every:
+                self.flush()
+
+    def parse(self, key, sql, dialect):
+        # Returns (dialect, ast); dialect may be 'auto' or a DialectDetector,
+        # in which case the detected dialect is kept with the AST
+        entry = self.entries.get(key)
+        if entry is not None and entry['ast'] is not None:
+            self.entries.move_to_end(key)
+            self.counters['ast_hits'] += 1
+            return entry['ast']
+        self.counters['ast_misses'] += 1
+        parsed = parse_sql(sql, dialect)
+        self._store(key, ast=parsed, ast_size=len(sql) * self.AST_BYTES_PER_CHAR)
+        return parsed
+
+    def _store(self, key, ast=None, rows=None, ast_size=0):
+        # The entry's size is that of the values it holds now: a replaced AST
+        # or row list gives its size back before the new one is counted
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            entry = {'ast': None, 'rows': None, 'ast_size': 0, 'rows_size': 0, 'size': 0}
+        else:
+            self.total_bytes -= entry['size']
+        if ast is not None:
+            entry['ast'] = ast
+            entry['ast_size'] = ast_size
+        if rows is not None:
+            entry['rows'] = rows
+            entry['rows_size'] = estimate_rows_size(rows)
+        entry['size'] = entry['ast_size'] + entry['rows_size']
+        self.entries[key] = entry
+        self.total_bytes += entry['size']
+        self._evict()
+
+    def _evict(self):
+        while self.entries and (len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes):
+            _, entry = self.entries.popitem(last=False)
+            self.total_bytes -= entry['size']
+            self.counters['evictions'] += 1
+
+    def stats(self):
+        lookups = self.counters['hits'] + self.counters['misses']
+        return dict(self.counters,
+                    entries=len(self.entries),
+                    bytes=self.total_bytes,
+                    hit_rate=self.counters['hits'] / lookups if lookups else 0.0)
+
+    def flush(self):
+        if self.db is not None and self.pending_writes:
+            self.db.commit()
+            self.pending_writes = 0
+
+    def close(self):
+        self.flush()
+        if self.db is not None:
+            self.db.close()
+            self.db = None
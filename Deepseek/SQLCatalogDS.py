@@ -0,0 +1,83 @@
+import csv
+import hashlib
+import json
+import os
+
+# Header names accepted for information_schema.columns style exports
+TABLE_HEADERS = ('table_name', 'table')
+COLUMN_HEADERS = ('column_name', 'column')
+POSITION_HEADERS = ('ordinal_position', 'position')
+
+class Catalog:
+    """Schema catalog: table -> ordered columns and column -> tables, keyed by
+    lowercased unqualified names (the analyzer reports tables without schema)."""
+
+    def __init__(self):
+        self.tables = {}          # table -> [column names in catalog order]
+        self.table_columns = {}   # table -> set of lowercased column names
+        self.column_tables = {}   # lowercased column -> set of tables
+        self.fingerprint = ''
+
+    def add_column(self, table, column):
+        table_key = table.strip().lower().rsplit('.', 1)[-1]
+        column_key = column.strip().lower()
+        known = self.table_columns.setdefault(table_key, set())
+        if column_key in known:
+            return
+        known.add(column_key)
+        self.tables.setdefault(table_key, []).append(column.strip())
+        self.column_tables.setdefault(column_key, set()).add(table_key)
+
+    def columns(self, table):
+        return self.tables.get((table or '').lower())
+
+    def knows(self, table):
+        return (table or '').lower() in self.table_columns
+
+    def has_column(self, table, column):
+        return column.lower() in self.table_columns.get(table.lower(), ())
+
+    def finish(self):
+        # Stable content hash so caches can tell catalogs apart
+        digest = hashlib.sha1()
+        for table in sorted(self.tables):
+            digest.update(table.encode('utf-8'))
+            digest.update('\0'.join(self.tables[table]).encode('utf-8'))
+        self.fingerprint = digest.hexdigest()
+        return self
+
+def pick(row, names):
+    for name in names:
+        if row.get(name):
+            return row[name]
+    return None
+
+def load_catalog(path):
+    """Loads a CSV information_schema.columns export, or JSON as either
+    {"table": ["col", ...]} or a list of {"table_name", "column_name"} records."""
+    catalog = Catalog()
+    if os.path.splitext(path)[1].lower() == '.json':
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            for table, columns in data.items():
+                for column in columns:
+                    catalog.add_column(table, column)
+            return catalog.finish()
+        records = data
+    else:
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            records = list(csv.DictReader(f))
+
+    rows = []
+    for record in records:
+        record = {str(key).strip().lower(): value for key, value in record.items()}
+        table, column = pick(record, TABLE_HEADERS), pick(record, COLUMN_HEADERS)
+        if table and column:
+            position = pick(record, POSITION_HEADERS)
+            rows.append((table, int(position) if str(position or '').isdigit() else 0, column))
+    # Keep catalog column order so SELECT * expands like the database would
+    rows.sort(key=lambda row: (row[0].lower(), row[1]))
+    for table, _, column in rows:
+        catalog.add_column(table, column)
+    return catalog.finish()
@@ -0,0 +1,86 @@
+import argparse
+import http.client
+import json
+import sys
+
+# Thin client for the lineage daemon (SQLDaemonDS). It only imports the
+# standard library so a per-file call from a CI hook or editor starts in
+# milliseconds; sqlglot is imported only when it has to fall back to
+# analyzing in-process because no daemon is listening.
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_TIMEOUT = 30
+FORMATS = ('csv', 'tsv', 'jsonl')  # same as SQLExportDS.FORMATS, kept import-free
+
+def request(method, path, payload=None, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=DEFAULT_TIMEOUT):
+    connection = http.client.HTTPConnection(host, port, timeout=timeout)
+    try:
+        body = json.dumps(payload).encode('utf-8') if payload is not None else None
+        connection.request(method, path, body=body, headers={'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        result = json.loads(response.read().decode('utf-8'))
+        if response.status != 200:
+            raise RuntimeError(result.get('error', f"daemon returned HTTP {response.status}"))
+        return result
+    finally:
+        connection.close()
+
+def analyze_remote(items, dialect="snowflake", fmt='csv', timeout=DEFAULT_TIMEOUT, host=DEFAULT_HOST,
+                   port=DEFAULT_PORT):
+    # items: [(source_file, sql)], sent as one batch; returns the formatted output
+    payload = {'items': [{'source_file': path, 'sql': sql} for path, sql in items],
+               'dialect': dialect, 'format': fmt, 'timeout': timeout}
+    # The daemon times out each item; the connection allows for a full queue
+    return request('POST', '/analyze', payload, host, port, timeout * max(1, len(items)) + 5)['output']
+
+def analyze_local(items, dialect="snowflake", fmt='csv'):
+    from SQLDaemonDS import analyze_item, render
+    from SQLScriptDS import make_dialect
+    dialect = make_dialect(dialect)
+    rows = []
+    for path, sql in items:
+        rows.extend(analyze_item(path, sql, dialect))
+    return render(rows, fmt)
+
+def read_items(paths):
+    items = []
+    for path in paths:
+        if path == '-':
+            items.append(('-', sys.stdin.read()))
+        else:
+            with open(path, encoding='utf-8') as f:
+                items.append((path, f.read()))
+    return items
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze SQL files through the lineage daemon")
+    parser.add_argument('paths', nargs='+', help=".sql files ('-' reads stdin)")
+    parser.add_argument('-o', '--output', help="output file (default: stdout)")
+    parser.add_argument('-f', '--format', choices=FORMATS, default='csv', help="output format")
+    parser.add_argument('--dialect', default='snowflake', help="sqlglot dialect, or 'auto' to detect it")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT, help="seconds allowed per file")
+    parser.add_argument('--no-fallback', action='store_true', help="fail instead of analyzing in-process")
+    args = parser.parse_args(argv)
+
+    items = read_items(args.paths)
+    try:
+        output = analyze_remote(items, args.dialect, args.format, args.timeout, args.host, args.port)
+    except ConnectionError as e:
+        # Nothing listening; a daemon that is up but slow is not second-guessed
+        if args.no_fallback:
+            print(f"daemon not reachable at {args.host}:{args.port}: {e}", file=sys.stderr)
+            return 2
+        output = analyze_local(items, args.dialect, args.format)
+
+    if args.output in (None, '-'):
+        sys.stdout.write(output)
+    else:
+        with open(args.output, 'w', newline='', encoding='utf-8') as out:
+            out.write(output)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+import argparse
+import asyncio
+import io
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+
+from SQLAnalyzerDS import error_row
+from SQLBatchDS import BATCH_FIELDS
+from SQLCacheDS import LineageCache
+from SQLClientDS import DEFAULT_HOST, DEFAULT_PORT, DEFAULT_TIMEOUT
+from SQLDialectDS import CANDIDATE_DIALECTS, DialectDetector, resolve_dialect, warm_parser
+from SQLExportDS import FORMATS, write_rows
+from SQLScriptDS import iter_script_lineage
+from SQLWorkerDS import AnalysisWorker
+
+# Long-running local lineage service: an asyncio HTTP/JSON endpoint in front
+# of a pool of warm analyzer processes (sqlglot imported, parsers built,
+# lineage cache filled). Endpoints:
+#   POST /analyze  {"items": [{"source_file", "sql"}], "dialect", "timeout", "format"}
+#                  or {"sql": ...}; returns {"rows": [...]} or, with a
+#                  format, {"output": text, "row_count": n}
+#   GET  /health   GET /stats
+# Items of one request are analyzed in parallel; an item that runs past its
+# timeout gets an error row and its worker process is killed and replaced.
+
+WORKER_CACHE_ENTRIES = 4096
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed'}
+
+def analyze_item(path, sql, dialect="snowflake", cache=None):
+    # Rows of one script, as SQLBatchDS produces them for a file
+    dialect = resolve_dialect(dialect)
+    if isinstance(dialect, DialectDetector):
+        dialect.use_source(path, os.path.dirname(path))
+    try:
+        return [dict(row, source_file=path) for row in iter_script_lineage(io.StringIO(sql), dialect, cache)]
+    except Exception as e:
+        return [dict(error_row(e), source_file=path)]
+
+def render(rows, fmt):
+    out = io.StringIO()
+    write_rows(rows, out, fmt, BATCH_FIELDS)
+    return out.getvalue()
+
+def daemon_worker_loop(requests, results):
+    cache = LineageCache(max_entries=WORKER_CACHE_ENTRIES)
+    for name in CANDIDATE_DIALECTS:
+        warm_parser(name)
+    while True:
+        job = requests.get()
+        if job is None:
+            break
+        job_id, path, sql, dialect = job
+        results.put((job_id, analyze_item(path, sql, dialect, cache)))
+
+class LineageDaemon:
+    def __init__(self, workers=None, timeout=DEFAULT_TIMEOUT):
+        self.size = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.workers = []
+        self.jobs = None
+        self.job_ids = count(1)
+        self.threads = ThreadPoolExecutor(max_workers=self.size)
+        self.counters = {'requests': 0, 'items': 0, 'timeouts': 0, 'errors': 0}
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.jobs = asyncio.Queue()
+        self.workers = [AnalysisWorker(daemon_worker_loop) for _ in range(self.size)]
+        self.tasks = [asyncio.create_task(self.run_worker(worker)) for worker in self.workers]
+        return await asyncio.start_server(self.handle, host, port)
+
+    def close(self):
+        for task in self.tasks:
+            task.cancel()
+        for worker in self.workers:
+            worker.close()
+        self.threads.shutdown(wait=False)
+
+    #------------ Worker pool ------
+    async def run_worker(self, worker):
+        # Feeds one worker process; result waits happen on a thread so the
+        # event loop keeps serving other requests
+        loop = asyncio.get_running_loop()
+        while True:
+            future, path, sql, dialect, timeout = await self.jobs.get()
+            if future.done():
+                continue
+            job_id = next(self.job_ids)
+            worker.submit(job_id, path, sql, dialect)
+            result = await loop.run_in_executor(self.threads, worker.wait, timeout)
+            if result is None:
+                self.counters['timeouts'] += 1
+                await loop.run_in_executor(self.threads, worker.cancel)
+                rows = [dict(error_row(TimeoutError(f"analysis exceeded {timeout}s")), source_file=path)]
+            else:
+                rows = result[1]
+            if not future.done():
+                future.set_result(rows)
+
+    async def analyze(self, items, dialect="snowflake", timeout=None):
+        loop = asyncio.get_running_loop()
+        futures = []
+        for path, sql in items:
+            future = loop.create_future()
+            self.jobs.put_nowait((future, path, sql, dialect, timeout or self.timeout))
+            futures.append(future)
+        rows = []
+        for item_rows in await asyncio.gather(*futures):
+            rows.extend(item_rows)
+        return rows
+
+    #------------ HTTP ------
+    async def handle(self, reader, writer):
+        try:
+            method, path, body = await read_request(reader)
+            status, payload = await self.route(method, path, body)
+        except Exception as e:
+            self.counters['errors'] += 1
+            status, payload = 400, {'error': str(e)}
+        data = json.dumps(payload).encode('utf-8')
+        writer.write((f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: application/json\r\n"
+                      f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n").encode('latin-1') + data)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def route(self, method, path, body):
+        if path == '/health':
+            return 200, {'status': 'ok', 'workers': self.size}
+        if path == '/stats':
+            return 200, dict(self.counters, queued=self.jobs.qsize(), workers=self.size)
+        if path != '/analyze':
+            return 404, {'error': f"unknown path {path}"}
+        if method != 'POST':
+            return 405, {'error': "use POST"}
+
+        request = json.loads(body or b'{}')
+        if 'sql' in request:
+            items = [(request.get('source_file', ''), request['sql'])]
+        else:
+            items = [(item.get('source_file', ''), item['sql']) for item in request.get('items', [])]
+        fmt = request.get('format')
+        if fmt is not None and fmt not in FORMATS:
+            return 400, {'error': f"unknown format {fmt}"}
+        self.counters['requests'] += 1
+        self.counters['items'] += len(items)
+        rows = await self.analyze(items, request.get('dialect', "snowflake"), request.get('timeout'))
+        if fmt is None:
+            return 200, {'rows': rows}
+        return 200, {'output': render(rows, fmt), 'row_count': len(rows)}
+
+async def read_request(reader):
+    request_line = (await reader.readline()).decode('latin-1')
+    method, path = request_line.split()[:2]
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get('content-length', 0))
+    body = await reader.readexactly(length) if length else b''
+    return method.upper(), path.split('?', 1)[0], body
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=None, timeout=DEFAULT_TIMEOUT):
+    daemon = LineageDaemon(workers, timeout)
+    server = await daemon.start(host, port)
+    print(f"lineage daemon listening on http://{host}:{port} with {daemon.size} workers", file=sys.stderr)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        daemon.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local lineage daemon with a warm worker pool")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('-w', '--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                        help="default seconds allowed per item before its worker is recycled")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.timeout))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+import re
+import sys
+
+from sqlglot.dialects.dialect import Dialect
+from sqlglot.errors import ParseError
+
+AUTO = 'auto'
+CANDIDATE_DIALECTS = ('snowflake', 'bigquery', 'tsql')
+
+# Cheap textual hints tried before any parse. A dialect whose markers appear
+# is tried first: several dialects accept each other's syntax without error
+# (Snowflake reads T-SQL [col] as an array index), so "first one that parses"
+# alone would pick wrongly.
+MARKERS = {
+    'tsql': re.compile(r"\[\w[^\]]*\]|\bTOP\s*\(?\d|@@|\bNOLOCK\b|\bGETDATE\s*\(|\bISNULL\s*\(|\bdbo\.", re.IGNORECASE),
+    'bigquery': re.compile(r"`|\bSAFE_CAST\s*\(|\b(?:STRUCT|ARRAY)\s*<|\b_TABLE_SUFFIX\b|\bEXCEPT\s*\(", re.IGNORECASE),
+    'snowflake': re.compile(r"::|\$\$|\bFLATTEN\s*\(|\bIFF\s*\(|\bVARIANT\b|\bQUALIFY\b", re.IGNORECASE),
+}
+
+# sqlglot's parser recurses once per nesting level and runs out of the default
+# limit at a couple of hundred nested subqueries; such statements are parsed
+# again under this limit (pure-Python frames, so it costs memory, not C stack)
+DEEP_RECURSION_LIMIT = 200000
+
+class WarmParser:
+    """Tokenizer and parser of one dialect, built once and reused; sqlglot's
+    parse_one resolves the dialect and builds both on every call."""
+
+    def __init__(self, name):
+        self.dialect = Dialect.get_or_raise(name)
+        self.tokenizer = self.dialect.tokenizer()
+        self.parser = self.dialect.parser()
+
+    def parse_one(self, sql):
+        try:
+            result = self.parser.parse(self.tokenizer.tokenize(sql), sql)
+        except RecursionError:
+            if sys.getrecursionlimit() >= DEEP_RECURSION_LIMIT:
+                raise
+            result = self.parse_deep(sql)
+        if not result or result[0] is None:
+            raise ParseError(f"No expression was parsed from '{sql}'")
+        return result[0]
+
+    def parse_deep(self, sql):
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(DEEP_RECURSION_LIMIT)
+        try:
+            return self.parser.parse(self.tokenizer.tokenize(sql), sql)
+        finally:
+            sys.setrecursionlimit(limit)
+
+# dialect name -> WarmParser, per process
+warm_parsers = {}
+
+def warm_parser(name):
+    parser = warm_parsers.get(name)
+    if parser is None:
+        parser = warm_parsers[name] = WarmParser(name)
+    return parser
+
+class DialectDetector:
+    """Picks the dialect of each statement from `candidates`. The winner is
+    remembered per source (file path, directory, ...) and tried first for the
+    next statement of that source, so a uniform file costs one parse per
+    statement; marker hits still take precedence over the remembered one."""
+
+    name = AUTO
+
+    def __init__(self, candidates=CANDIDATE_DIALECTS):
+        self.candidates = tuple(candidates)
+        self.winners = {}    # source key -> dialect
+        self.sources = ()    # keys of the source being analyzed, most specific first
+        self.counters = {}
+
+    def use_source(self, *keys):
+        self.sources = tuple(key for key in keys if key)
+
+    def order(self, sql):
+        hint = next((self.winners[key] for key in self.sources if key in self.winners), None)
+        scores = {name: 1 if name in MARKERS and MARKERS[name].search(sql) else 0 for name in self.candidates}
+        ranked = sorted(self.candidates, key=lambda name: (-scores[name], name != hint))
+        return ranked, hint
+
+    def parse(self, sql):
+        # Returns (dialect, expression); raises the error of the most likely
+        # dialect when none of them parses
+        ranked, hint = self.order(sql)
+        first_error = None
+        for attempt, name in enumerate(ranked):
+            try:
+                parsed = warm_parser(name).parse_one(sql)
+            except Exception as e:
+                first_error = first_error or e
+                continue
+            self.count('statements')
+            self.count(f'won_{name}')
+            self.count('attempts', attempt + 1)
+            if attempt == 0:
+                self.count('first_try')
+                if name == hint:
+                    self.count('hint_hits')
+            for key in self.sources:
+                self.winners[key] = name
+            return name, parsed
+        self.count('statements')
+        self.count('failed')
+        self.count('attempts', len(ranked))
+        raise first_error
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def take_counters(self):
+        # Counters since the last call, for workers reporting back to a parent
+        counters, self.counters = self.counters, {}
+        return counters
+
+    def merge(self, counters):
+        for name, amount in counters.items():
+            self.count(name, amount)
+
+    def stats(self):
+        statements = self.counters.get('statements', 0)
+        stats = dict(self.counters)
+        stats['hit_rate'] = round(self.counters.get('first_try', 0) / statements, 3) if statements else 0.0
+        return stats
+
+# Shared by callers that just pass dialect="auto"
+default_detector = None
+
+def resolve_dialect(dialect):
+    # 'auto' -> the shared detector; names and detectors are returned as is
+    global default_detector
+    if dialect != AUTO:
+        return dialect
+    if default_detector is None:
+        default_detector = DialectDetector()
+    return default_detector
+
+def parse_sql(sql, dialect):
+    """(dialect name, expression) for a dialect name, 'auto' or a DialectDetector."""
+    dialect = resolve_dialect(dialect)
+    if isinstance(dialect, DialectDetector):
+        return dialect.parse(sql)
+    return dialect, warm_parser(dialect).parse_one(sql)
+
+def backslash_escapes(dialect):
+    # Whether \' escapes a quote inside strings (Snowflake, BigQuery, MySQL)
+    # or the backslash is a plain character and the quote ends the string
+    # (T-SQL, Postgres, ANSI). A detector honors them if any candidate does.
+    dialect = resolve_dialect(dialect)
+    if isinstance(dialect, DialectDetector):
+        return any(backslash_escapes(name) for name in dialect.candidates)
+    return '\\' in Dialect.get_or_raise(dialect).tokenizer_class.STRING_ESCAPES
+
+def dialect_key(dialect):
+    # Cache key part: detectors are keyed as 'auto'
+    return dialect if isinstance(dialect, str) or dialect is None else dialect.name
@@ -0,0 +1,213 @@
+import csv
+import json
+import sqlite3
+import sys
+from array import array
+from contextlib import contextmanager
+
+from SQLAnalyzerDS import ROW_FIELDS
+
+HEADERS = {
+    'source_file': 'SOURCE FILE',
+    'statement_index': 'STATEMENT',
+    'target_object': 'TARGET OBJECT',
+    'result_query': 'RESULT QUERY',
+    'result_column': 'RESULT COLUMN',
+    'source_table': 'SOURCE TABLE',
+    'source_column': 'SOURCE COLUMN',
+    'object': 'OBJECT',
+    'depends_on': 'DEPENDS ON',
+    'depends_on_type': 'DEPENDS ON TYPE',
+    'fingerprint': 'FINGERPRINT',
+    'statements': 'STATEMENTS',
+    'first_statement': 'FIRST STATEMENT',
+    'shape': 'SHAPE',
+    'reason': 'REASON',
+    'elapsed': 'ELAPSED S',
+    'peak_mb': 'PEAK MB',
+    'retry': 'RETRY',
+    'statement_chars': 'STATEMENT CHARS'
+}
+
+FORMATS = ('csv', 'tsv', 'jsonl')
+# Written to a file path rather than a text stream
+FILE_FORMATS = ('sqlite', 'parquet', 'arrow')
+
+INTEGER_FIELDS = frozenset(('statement_index', 'statements', 'first_statement'))
+EXPORT_BATCH_ROWS = 65536
+# Lookups impact analysis runs on the SQLite export; each index is built
+# once after the load (one sort) instead of updated per inserted row, and
+# only when all of its columns are exported
+SQLITE_INDEXES = (
+    ('source_table', 'source_column'),
+    ('target_object', 'result_column'),
+    ('depends_on',),
+    ('fingerprint',),
+)
+
+@contextmanager
+def open_output(path=None):
+    # None or '-' means stdout, which is left open for the caller
+    if path in (None, '-'):
+        yield sys.stdout
+    else:
+        with open(path, 'w', newline='', encoding='utf-8') as out:
+            yield out
+
+def write_delimited(rows, out, fields=ROW_FIELDS, delimiter=',', header=True):
+    # csv.writer quotes values containing the delimiter, quotes or newlines
+    # (expression aliases from get_alias often contain commas)
+    writer = csv.writer(out, delimiter=delimiter, lineterminator='\n')
+    if header:
+        writer.writerow([HEADERS.get(field, field.upper()) for field in fields])
+    count = 0
+    for row in rows:
+        writer.writerow([row.get(field, '') for field in fields])
+        count += 1
+    return count
+
+def write_csv(rows, out, fields=ROW_FIELDS, header=True):
+    return write_delimited(rows, out, fields, ',', header)
+
+def write_tsv(rows, out, fields=ROW_FIELDS, header=True):
+    return write_delimited(rows, out, fields, '\t', header)
+
+def write_jsonl(rows, out, fields=ROW_FIELDS, header=True):
+    count = 0
+    for row in rows:
+        out.write(json.dumps({field: row.get(field, '') for field in fields}))
+        out.write('\n')
+        count += 1
+    return count
+
+WRITERS = {'csv': write_csv, 'tsv': write_tsv, 'jsonl': write_jsonl}
+
+def write_rows(rows, out, fmt='csv', fields=ROW_FIELDS, header=True):
+    """Streams rows (any iterable of row dicts) to out; returns the row count."""
+    return WRITERS[fmt](rows, out, fields, header)
+
+def iter_batches(rows, fields, size=EXPORT_BATCH_ROWS):
+    # Lists of value tuples in `fields` order; missing values are None (NULL)
+    batch = []
+    for row in rows:
+        batch.append(tuple(row.get(field) for field in fields))
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def write_sqlite(rows, path, fields=ROW_FIELDS, table='lineage', batch_rows=EXPORT_BATCH_ROWS):
+    """Loads rows into `table` of a SQLite database, replacing it: batched
+    executemany in a single transaction, indexes created after the load.
+    Returns the row count."""
+    columns = ', '.join(f"{field} {'INTEGER' if field in INTEGER_FIELDS else 'TEXT'}" for field in fields)
+    insert = f"INSERT INTO {table} VALUES ({', '.join('?' * len(fields))})"
+    connection = sqlite3.connect(path)
+    try:
+        # The file is an export rebuilt by the next run, not a system of record
+        connection.execute("PRAGMA synchronous = OFF")
+        count = 0
+        with connection:
+            connection.execute(f"DROP TABLE IF EXISTS {table}")
+            connection.execute(f"CREATE TABLE {table} ({columns})")
+            for batch in iter_batches(rows, fields, batch_rows):
+                connection.executemany(insert, batch)
+                count += len(batch)
+            for index_columns in SQLITE_INDEXES:
+                if all(column in fields for column in index_columns):
+                    name = '_'.join((table,) + index_columns)
+                    connection.execute(f"CREATE INDEX {name} ON {table} ({', '.join(index_columns)})")
+        return count
+    finally:
+        connection.close()
+
+def import_pyarrow():
+    # Optional dependency, only needed for the parquet/arrow exports
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("parquet/arrow export requires pyarrow (pip install pyarrow)") from None
+    return pyarrow
+
+def encode_columns(rows, fields):
+    # Column-wise copy of the rows: text fields become int32 codes into one
+    # dictionary of distinct values per field (table and column names repeat
+    # across thousands of rows), integer fields stay lists. Every batch is
+    # later cut from the same dictionaries, as the Arrow IPC file requires.
+    codes = {field: array('i') if field not in INTEGER_FIELDS else [] for field in fields}
+    dictionaries = {field: {} for field in fields if field not in INTEGER_FIELDS}
+    count = 0
+    for batch in iter_batches(rows, fields):
+        for position, field in enumerate(fields):
+            values = (row[position] for row in batch)
+            if field in INTEGER_FIELDS:
+                codes[field].extend(values)
+            else:
+                dictionary = dictionaries[field]
+                codes[field].extend(dictionary.setdefault('' if value is None else value, len(dictionary))
+                                    for value in values)
+        count += len(batch)
+    return count, codes, dictionaries
+
+def iter_record_batches(pa, fields, count, codes, dictionaries, batch_rows=EXPORT_BATCH_ROWS):
+    schema = arrow_schema(pa, fields)
+    arrays = {field: pa.array([str(value) for value in dictionary], pa.string())
+              for field, dictionary in dictionaries.items()}
+    buffers = {field: pa.py_buffer(codes[field]) for field in dictionaries}
+    for start in range(0, count, batch_rows):
+        length = min(batch_rows, count - start)
+        columns = []
+        for field in fields:
+            if field in INTEGER_FIELDS:
+                columns.append(pa.array(codes[field][start:start + length], pa.int64()))
+            else:
+                indices = pa.Array.from_buffers(pa.int32(), length, [None, buffers[field]], offset=start)
+                columns.append(pa.DictionaryArray.from_arrays(indices, arrays[field]))
+        yield pa.RecordBatch.from_arrays(columns, schema=schema)
+
+def arrow_schema(pa, fields):
+    return pa.schema([(field, pa.int64() if field in INTEGER_FIELDS else pa.dictionary(pa.int32(), pa.string()))
+                      for field in fields])
+
+def write_parquet(rows, path, fields=ROW_FIELDS):
+    """Parquet file with dictionary-encoded text columns; returns the row count."""
+    pa = import_pyarrow()
+    import pyarrow.parquet as pq
+    count, codes, dictionaries = encode_columns(rows, fields)
+    with pq.ParquetWriter(path, arrow_schema(pa, fields), use_dictionary=True) as writer:
+        for batch in iter_record_batches(pa, fields, count, codes, dictionaries):
+            writer.write_batch(batch)
+    return count
+
+def write_arrow(rows, path, fields=ROW_FIELDS):
+    """Arrow IPC file (Feather v2) with dictionary-encoded text columns; returns the row count."""
+    pa = import_pyarrow()
+    count, codes, dictionaries = encode_columns(rows, fields)
+    with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, arrow_schema(pa, fields)) as writer:
+        for batch in iter_record_batches(pa, fields, count, codes, dictionaries):
+            writer.write_batch(batch)
+    return count
+
+FILE_WRITERS = {'sqlite': write_sqlite, 'parquet': write_parquet, 'arrow': write_arrow}
+
+def check_export_args(parser, fmt, path):
+    # CLI helper: reports a file format sent to stdout, or parquet/arrow
+    # without pyarrow, as a usage error before any analysis runs
+    if fmt in FILE_FORMATS and path in (None, '-'):
+        parser.error(f"--format {fmt} needs an output file (-o)")
+    if fmt in ('parquet', 'arrow'):
+        try:
+            import_pyarrow()
+        except ImportError as e:
+            parser.error(str(e))
+
+def export_rows(rows, path=None, fmt='csv', fields=ROW_FIELDS):
+    """Writes rows to `path` in any format (text formats: None or '-' is
+    stdout); returns the row count."""
+    if fmt in FILE_WRITERS:
+        if path in (None, '-'):
+            raise ValueError(f"{fmt} output needs a file path")
+        return FILE_WRITERS[fmt](rows, path, fields)
+    with open_output(path) as out:
+        return write_rows(rows, out, fmt, fields)
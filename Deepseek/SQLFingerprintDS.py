@@ -0,0 +1,190 @@
+import argparse
+import csv
+import hashlib
+import os
+import re
+import sys
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from SQLAnalyzerDS import ROW_FIELDS, iter_lineage
+from SQLCatalogDS import load_catalog
+from SQLDialectDS import CANDIDATE_DIALECTS, DialectDetector, backslash_escapes
+from SQLExportDS import FILE_FORMATS, FORMATS, check_export_args, export_rows, open_output, write_rows
+from SQLProfileDS import Profiler, write_report
+from SQLScriptDS import (CHUNK_SIZE, analyze_statement, init_worker, iter_statements, make_dialect,
+                         merge_report)
+
+# Query-history exports repeat a few thousand query shapes millions of times
+# with different literals. Statements are reduced to a shape (literals -> ?,
+# literal lists -> one ?, comments dropped, whitespace and unquoted
+# identifier case canonical) and hashed; each shape is analyzed once, from
+# its first statement, and its rows are fanned back out to every statement.
+# Literals don't change lineage, except in the names of unaliased expression
+# columns, which are those of the first statement.
+
+LOG_FIELDS = ('statement_index', 'fingerprint', 'target_object') + ROW_FIELDS
+SHAPE_FIELDS = ('fingerprint', 'statements', 'first_statement', 'shape')
+CSV_FIELD_LIMIT = 2 ** 31 - 1  # query texts easily exceed csv's 128KB default
+
+SHAPE_TOKEN = re.compile(r"""
+    (?P<space> (?:\s+ | --[^\n]* | /\*.*?\*/)+ )
+  | (?P<literal> '(?:[^'\\]|\\.|'')*' | \$\$.*?\$\$ | (?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)? )
+  | (?P<quoted> "(?:[^"]|"")*" | `[^`]*` | \[[^\]]*\] )
+  | (?P<word> [^\W\d][\w$]* )
+  | (?P<other> . )
+""", re.VERBOSE | re.DOTALL)
+# `?, ?, ?` (IN lists, VALUES rows) and `(?), (?)` collapse to a single item
+LITERAL_LIST = re.compile(r"\?(?: , \?)+")
+ROW_LIST = re.compile(r"\( \? \)(?: , \( \? \))+")
+
+def query_shape(sql):
+    tokens = []
+    for match in SHAPE_TOKEN.finditer(sql):
+        kind = match.lastgroup
+        if kind == 'space':
+            continue
+        if kind == 'literal':
+            tokens.append('?')
+        elif kind == 'word':
+            tokens.append(match.group().lower())
+        else:
+            tokens.append(match.group())
+    while tokens and tokens[-1] == ';':
+        tokens.pop()
+    return ROW_LIST.sub('( ? )', LITERAL_LIST.sub('?', ' '.join(tokens)))
+
+def fingerprint(sql):
+    """(fingerprint, shape) of one statement."""
+    shape = query_shape(sql)
+    return hashlib.sha1(shape.encode('utf-8')).hexdigest()[:16], shape
+
+def note_shape(shapes, index, sql):
+    key, shape = fingerprint(sql)
+    entry = shapes.get(key)
+    if entry is None:
+        shapes[key] = {'fingerprint': key, 'statements': 1, 'first_statement': index, 'shape': shape}
+    else:
+        entry['statements'] += 1
+    return key
+
+def fan_out(rows, index, key):
+    for row in rows:
+        yield dict(row, statement_index=index, fingerprint=key)
+
+def iter_log_lineage(statements, dialect="snowflake", workers=1, profiler=None, catalog=None, shapes=None,
+                     per_shape=False):
+    """Yields lineage rows for every statement of a query log (an iterable of
+    SQL strings), analyzing each distinct shape once. `shapes` (a dict) is
+    filled with fingerprint -> {'statements', 'first_statement', 'shape'}.
+    per_shape=True yields the rows of the first statement of each shape only."""
+    shapes = {} if shapes is None else shapes
+    results = {}  # fingerprint -> rows of its first statement, or their Future
+    numbered = enumerate(statements, 1)
+    if workers == 1:
+        for index, sql in numbered:
+            key = note_shape(shapes, index, sql)
+            rows = results.get(key)
+            if rows is None:
+                if profiler is not None:
+                    profiler.count('shapes')
+                rows = results[key] = list(iter_lineage(sql, dialect, profiler=profiler, catalog=catalog))
+            elif per_shape:
+                continue
+            yield from fan_out(rows, index, key)
+        return
+
+    # Only a shape's first statement goes to the pool. Statements are yielded
+    # in order: the oldest waits for its shape once `window` are queued, and
+    # any whose shape is already resolved goes right away.
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(catalog, dialect)) as executor:
+        window = (workers or os.cpu_count() or 1) * 64
+        pending = deque()
+        for index, sql in numbered:
+            key = note_shape(shapes, index, sql)
+            if key not in results:
+                results[key] = executor.submit(analyze_statement, (index, sql, profiler is not None))
+            elif per_shape:
+                continue
+            pending.append((index, key))
+            while pending and (len(pending) >= window or is_resolved(results[pending[0][1]])):
+                yield from collect_shape(pending.popleft(), results, profiler, dialect)
+        while pending:
+            yield from collect_shape(pending.popleft(), results, profiler, dialect)
+
+def is_resolved(result):
+    return not isinstance(result, Future) or result.done()
+
+def collect_shape(item, results, profiler, dialect):
+    index, key = item
+    rows = results[key]
+    if isinstance(rows, Future):
+        rows, report = rows.result()
+        merge_report(report, profiler, dialect)
+        if profiler is not None:
+            profiler.count('shapes')
+        results[key] = rows
+    return fan_out(rows, index, key)
+
+def iter_log_statements(stream, column=None, chunk_size=CHUNK_SIZE, escapes=True):
+    # Statements of a ;-separated log, or the `column` of a CSV export
+    # (e.g. QUERY_TEXT of Snowflake's QUERY_HISTORY)
+    if column is None:
+        yield from iter_statements(stream, chunk_size, escapes)
+        return
+    csv.field_size_limit(CSV_FIELD_LIMIT)
+    for record in csv.DictReader(stream):
+        sql = (record.get(column) or '').strip()
+        if sql:
+            yield sql
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lineage for a query log, analyzing each distinct query shape once")
+    parser.add_argument('log', help="query log: ;-separated SQL, or CSV with --column ('-' reads stdin)")
+    parser.add_argument('--column', help="CSV column holding the query text (e.g. QUERY_TEXT)")
+    parser.add_argument('-w', '--workers', type=int, default=1, help="worker processes (0: CPU count)")
+    parser.add_argument('-o', '--output', help="output file (default: stdout)")
+    parser.add_argument('-f', '--format', choices=FORMATS + FILE_FORMATS, default='csv',
+                        help="output format (sqlite/parquet/arrow need -o)")
+    parser.add_argument('--shapes', metavar='PATH', help="write fingerprint, frequency and shape per distinct shape")
+    parser.add_argument('--per-shape', action='store_true',
+                        help="write the rows of each shape's first statement only instead of every statement")
+    parser.add_argument('--dialect', default='snowflake', help="sqlglot dialect, or 'auto' to detect it")
+    parser.add_argument('--dialects', default=','.join(CANDIDATE_DIALECTS),
+                        help="comma-separated candidates tried by --dialect auto")
+    parser.add_argument('--catalog', help="information_schema columns export (CSV or JSON) used to "
+                                          "resolve unqualified columns and expand *")
+    parser.add_argument('--profile', nargs='?', const='-', metavar='PATH',
+                        help="write a per-phase JSON profile to PATH (default: stderr)")
+    args = parser.parse_args(argv)
+    check_export_args(parser, args.format, args.output)
+
+    catalog = load_catalog(args.catalog) if args.catalog else None
+    dialect = make_dialect(args.dialect, args.dialects.split(','))
+    if isinstance(dialect, DialectDetector):
+        dialect.use_source(args.log)
+    stream = sys.stdin if args.log == '-' else open(args.log, encoding='utf-8', newline='')
+    profiler = Profiler() if args.profile else None
+    shapes = {}
+    try:
+        log = iter_log_statements(stream, args.column, escapes=backslash_escapes(dialect))
+        rows = iter_log_lineage(log, dialect, args.workers or None, profiler, catalog, shapes, args.per_shape)
+        export_rows(rows, args.output, args.format, LOG_FIELDS)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+    if args.shapes:
+        ranked = sorted(shapes.values(), key=lambda entry: (-entry['statements'], entry['first_statement']))
+        with open_output(args.shapes) as out:
+            write_rows(ranked, out, 'csv', SHAPE_FIELDS)
+    statements = sum(entry['statements'] for entry in shapes.values())
+    print(f"{statements} statements, {len(shapes)} distinct shapes analyzed", file=sys.stderr)
+    if profiler is not None:
+        write_report(profiler.report(), args.profile)
+    if isinstance(dialect, DialectDetector):
+        print(f"dialects: {dialect.stats()}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
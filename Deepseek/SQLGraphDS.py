@@ -0,0 +1,315 @@
+import argparse
+import sqlite3
+import sys
+
+# Nodes are 'object.column', lowercased. Objects are keyed by their last name
+# part because the analyzer reports source tables without schema, while
+# CREATE VIEW targets may be qualified.
+
+def object_key(name):
+    return (name or '').strip().lower().rsplit('.', 1)[-1]
+
+def node_key(obj, column):
+    return f"{object_key(obj)}.{(column or '').strip().lower()}"
+
+class LineageGraph:
+    """Column-level lineage across statements. Each analyzed object (view,
+    INSERT/CTAS target) contributes edges target column -> source columns,
+    kept per source file: reloading a file replaces what that file said about
+    the object, and the edges of files that load the same table are merged.
+    The base-table closure of every target column is precomputed and kept
+    current as objects are re-analyzed, and base columns have a reverse index
+    of everything downstream of them."""
+
+    def __init__(self, path=None):
+        self.edges = {}             # node -> set of direct source nodes, merged across files
+        self.reverse = {}           # node -> set of direct dependent nodes
+        self.objects = {}           # object -> {source file -> {target node -> set of source nodes}}
+        self.files = {}             # source file -> set of objects it gives edges
+        self.closure = {}           # target node -> frozenset of base nodes
+        self.base_dependents = {}   # base node -> set of nodes whose closure holds it
+        self.dirty_objects = set()
+        self.dirty_closure = set()
+        self.db = None
+        if path:
+            self.db = sqlite3.connect(path)
+            columns = [info[1] for info in self.db.execute("PRAGMA table_info(edges)")]
+            if columns and 'source_file' not in columns:
+                # Graphs saved before edges were kept per file: rebuilt by loading the files again
+                self.db.executescript("DROP TABLE edges; DROP TABLE IF EXISTS closure;")
+            self.db.executescript("""
+                CREATE TABLE IF NOT EXISTS edges (object TEXT NOT NULL, source_file TEXT NOT NULL,
+                                                  node TEXT NOT NULL, source TEXT NOT NULL);
+                CREATE INDEX IF NOT EXISTS edges_object ON edges (object);
+                CREATE TABLE IF NOT EXISTS closure (node TEXT NOT NULL, base TEXT NOT NULL);
+                CREATE INDEX IF NOT EXISTS closure_node ON closure (node);
+            """)
+            self.load()
+
+    def load(self):
+        for obj, source_file, node, source in self.db.execute("SELECT object, source_file, node, source FROM edges"):
+            self.objects.setdefault(obj, {}).setdefault(source_file, {}).setdefault(node, set()).add(source)
+            self.files.setdefault(source_file, set()).add(obj)
+            self.edges.setdefault(node, set()).add(source)
+            self.reverse.setdefault(source, set()).add(node)
+        closure = {}
+        for node, base in self.db.execute("SELECT node, base FROM closure"):
+            closure.setdefault(node, set()).add(base)
+        for node, bases in closure.items():
+            self.closure[node] = frozenset(bases)
+            for base in bases:
+                self.base_dependents.setdefault(base, set()).add(node)
+
+    #------------ Updates ------
+    def add_rows(self, rows, source_file=''):
+        # Groups all the lineage rows of one file by target object; rows
+        # without one can't be linked. Objects the file no longer defines lose
+        # what it said about them. Returns the keys of the objects updated.
+        by_object = {}
+        for row in rows:
+            target = row.get('target_object')
+            if target:
+                by_object.setdefault(target, []).append(row)
+        for target, object_rows in by_object.items():
+            self.update_object(target, object_rows, source_file)
+        updated = {object_key(target) for target in by_object}
+        for obj in self.files.get(source_file, set()) - updated:
+            self._replace_edges(obj, source_file, {})
+        return updated
+
+    def update_object(self, target, rows, source_file=''):
+        """Replaces the lineage one file gives an object and refreshes every
+        closure that depends on it."""
+        obj = object_key(target)
+        new_edges = {}
+        for row in rows:
+            if row.get('source_table') == 'Error':
+                continue
+            node = node_key(obj, row.get('result_column'))
+            new_edges.setdefault(node, set()).add(node_key(row.get('source_table'), row.get('source_column')))
+        self._replace_edges(obj, source_file, new_edges)
+
+    def remove_object(self, target, source_file=None):
+        # Drops what `source_file` (by default: every file) says about the object
+        obj = object_key(target)
+        files = list(self.objects.get(obj, ())) if source_file is None else [source_file]
+        for name in files:
+            self._replace_edges(obj, name, {})
+
+    def _replace_edges(self, obj, source_file, new_edges):
+        by_file = self.objects.setdefault(obj, {})
+        old_edges = by_file.pop(source_file, {})
+        file_objects = self.files.setdefault(source_file, set())
+        if new_edges:
+            by_file[source_file] = new_edges
+            file_objects.add(obj)
+        else:
+            file_objects.discard(obj)
+            if not file_objects:
+                del self.files[source_file]
+        if not by_file:
+            del self.objects[obj]
+        changed = set(old_edges) | set(new_edges)
+        for node in changed:
+            merged = set()
+            for file_edges in by_file.values():
+                merged |= file_edges.get(node, set())
+            old_sources = self.edges.pop(node, set())
+            for source in old_sources - merged:
+                dependents = self.reverse.get(source)
+                if dependents is not None:
+                    dependents.discard(node)
+                    if not dependents:
+                        del self.reverse[source]
+            for source in merged - old_sources:
+                self.reverse.setdefault(source, set()).add(node)
+            if merged:
+                self.edges[node] = merged
+        self.dirty_objects.add(obj)
+        self._refresh(changed)
+
+    def _refresh(self, changed):
+        # Everything downstream of a changed node may have a different closure
+        affected = set(changed)
+        stack = list(changed)
+        while stack:
+            for dependent in self.reverse.get(stack.pop(), ()):
+                if dependent not in affected:
+                    affected.add(dependent)
+                    stack.append(dependent)
+
+        computed = self._compute_closure(affected)
+        for node in affected:
+            old = self.closure.get(node, frozenset())
+            new = computed.get(node, frozenset()) if node in self.edges else frozenset()
+            if old == new:
+                continue
+            for base in old - new:
+                dependents = self.base_dependents.get(base)
+                if dependents is not None:
+                    dependents.discard(node)
+                    if not dependents:
+                        del self.base_dependents[base]
+            for base in new - old:
+                self.base_dependents.setdefault(base, set()).add(node)
+            if new:
+                self.closure[node] = new
+            else:
+                self.closure.pop(node, None)
+            self.dirty_closure.add(node)
+
+    def _compute_closure(self, affected):
+        # Iterative post-order over the affected nodes; unaffected nodes reuse
+        # their stored closure. A node met again while still open is part of a
+        # cycle and contributes nothing on that path.
+        done = {}
+        open_nodes = set()
+        for root in affected:
+            stack = [(root, False)]
+            while stack:
+                node, expanded = stack.pop()
+                if node in done:
+                    continue
+                sources = self.edges.get(node)
+                if not sources:
+                    done[node] = frozenset((node,))
+                elif node not in affected:
+                    done[node] = self.closure.get(node, frozenset())
+                elif expanded:
+                    bases = set()
+                    for source in sources:
+                        bases |= done.get(source, frozenset())
+                    done[node] = frozenset(bases)
+                    open_nodes.discard(node)
+                elif node not in open_nodes:
+                    open_nodes.add(node)
+                    stack.append((node, True))
+                    stack.extend((source, False) for source in sources
+                                 if source not in done and source not in open_nodes)
+        return done
+
+    #------------ Queries ------
+    # Without a catalog, SELECT * from a table is a single v.* -> t.* edge, so
+    # v.b has no edges of its own; it is read as t.b through v.*.
+    def star_sources(self, node):
+        # Nodes a column of a star-only object reads, or () if it has edges
+        # of its own (or is a * node itself)
+        obj, _, column = node.rpartition('.')
+        if column == '*' or node in self.edges:
+            return ()
+        return [f"{source[:-2]}.{column}" for source in self.edges.get(f"{obj}.*", ()) if source.endswith('.*')]
+
+    def star_dependents(self, node):
+        # Columns of star-only objects downstream of a column through t.* -> v.*
+        obj, _, column = node.rpartition('.')
+        if column == '*':
+            return []
+        return [f"{dependent[:-2]}.{column}" for dependent in self.reverse.get(f"{obj}.*", ())
+                if dependent.endswith('.*')]
+
+    def base_sources(self, obj, column):
+        node = node_key(obj, column)
+        if node not in self.edges and not self.star_sources(node):
+            return [node] if node in self.reverse else []
+        found = set()
+        seen = set()
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node in seen:
+                continue
+            seen.add(node)
+            for base in (self.closure.get(node, ()) if node in self.edges else (node,)):
+                through_star = self.star_sources(base)
+                if through_star:
+                    stack.extend(through_star)
+                else:
+                    found.add(base)
+        return sorted(found)
+
+    def dependents(self, obj, column):
+        """All downstream columns (transitively) that read obj.column."""
+        node = node_key(obj, column)
+        if node not in self.edges and node in self.base_dependents and not self.star_dependents(node):
+            return sorted(self.base_dependents[node])
+        found = set()
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            for dependent in list(self.reverse.get(node, ())) + self.star_dependents(node):
+                if dependent not in found:
+                    found.add(dependent)
+                    stack.append(dependent)
+        return sorted(found)
+
+    def stats(self):
+        return {
+            'objects': len(self.objects),
+            'target_columns': len(self.edges),
+            'edges': sum(len(sources) for sources in self.edges.values()),
+            'base_columns': len(self.base_dependents)
+        }
+
+    #------------ Persistence ------
+    def commit(self):
+        if self.db is None:
+            return
+        with self.db:
+            for obj in self.dirty_objects:
+                self.db.execute("DELETE FROM edges WHERE object = ?", (obj,))
+                self.db.executemany("INSERT INTO edges (object, source_file, node, source) VALUES (?, ?, ?, ?)",
+                                    [(obj, source_file, node, source)
+                                     for source_file, file_edges in self.objects.get(obj, {}).items()
+                                     for node, sources in file_edges.items() for source in sources])
+            for node in self.dirty_closure:
+                self.db.execute("DELETE FROM closure WHERE node = ?", (node,))
+                self.db.executemany("INSERT INTO closure (node, base) VALUES (?, ?)",
+                                    [(node, base) for base in self.closure.get(node, ())])
+        self.dirty_objects.clear()
+        self.dirty_closure.clear()
+
+    def close(self):
+        self.commit()
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+def split_node(text):
+    obj, _, column = text.rpartition('.')
+    return obj, column
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cross-statement lineage graph")
+    parser.add_argument('db', help="SQLite graph file")
+    sub = parser.add_subparsers(dest='command', required=True)
+    load = sub.add_parser('load', help="analyze SQL files and (re)load their objects into the graph")
+    load.add_argument('paths', nargs='+', help="directories, glob patterns or .sql files")
+    load.add_argument('-w', '--workers', type=int, default=None, help="number of worker processes")
+    sources = sub.add_parser('sources', help="base columns an object column comes from")
+    sources.add_argument('node', help="object.column")
+    impact = sub.add_parser('impact', help="downstream columns that depend on an object column")
+    impact.add_argument('node', help="object.column")
+    sub.add_parser('stats', help="graph size")
+    args = parser.parse_args(argv)
+
+    graph = LineageGraph(args.db)
+    try:
+        if args.command == 'load':
+            from SQLBatchDS import collect_sql_files, run_batch
+            files = collect_sql_files(args.paths)
+            loaded = set()
+            for path, rows in run_batch(files, args.workers):
+                loaded |= graph.add_rows(rows, path)
+            print(f"loaded {len(loaded)} objects from {len(files)} files; {graph.stats()}")
+        elif args.command == 'sources':
+            print('\n'.join(graph.base_sources(*split_node(args.node))))
+        elif args.command == 'impact':
+            print('\n'.join(graph.dependents(*split_node(args.node))))
+        else:
+            print(graph.stats())
+    finally:
+        graph.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+import csv
+import io
+import tkinter as tk
+from tkinter import ttk
+
+# Virtualized result table of the analyzer GUI. The Treeview only ever holds
+# one item per visible line; scrolling rewrites their values from a page of
+# the backing store, so a million lineage rows cost no more to show than a
+# screenful.
+
+FILTER_DELAY_MS = 300
+WHEEL_ROWS = 3
+SORT_MARKS = (' \u25b2', ' \u25bc')
+
+class RowStore:
+    """Rows (sequences of display values, extra trailing fields are ignored)
+    and the current view: indexes of the rows passing the filter, in sort
+    order. Sorting orders all rows once; filtering keeps that order."""
+
+    def __init__(self, rows=(), width=None):
+        self.rows = rows if isinstance(rows, list) else list(rows)
+        self.width = width
+        self.sort_column = None
+        self.descending = False
+        self.needle = ''
+        self.search_text = None  # lowercased row text, built on the first filter
+        self.order = list(range(len(self.rows)))
+        self.view = self.order
+
+    def __len__(self):
+        return len(self.view)
+
+    def sort(self, column, descending=False):
+        rows = self.rows
+        self.sort_column = column
+        self.descending = descending
+        self.order = sorted(range(len(rows)), key=lambda i: str(rows[i][column]).lower(), reverse=descending)
+        self.apply_filter(self.needle)
+
+    def apply_filter(self, needle):
+        # Case-insensitive substring match on any displayed value
+        self.needle = needle.strip().lower()
+        if not self.needle:
+            self.view = self.order
+            return
+        if self.search_text is None:
+            self.search_text = ['\0'.join(map(str, row[:self.width])).lower() for row in self.rows]
+        text = self.search_text
+        needle = self.needle
+        self.view = [i for i in self.order if needle in text[i]]
+
+    def page(self, start, count):
+        rows = self.rows
+        return [rows[i][:self.width] for i in self.view[start:start + count]]
+
+    def iter_view(self):
+        rows = self.rows
+        for i in self.view:
+            yield rows[i][:self.width]
+
+class ResultGrid(ttk.Frame):
+    """Sortable (click a heading), filterable table over a RowStore with a
+    "Copy all as CSV" action that puts the current view on the clipboard."""
+
+    def __init__(self, master, headings, height=20, column_width=160, **kwargs):
+        super().__init__(master, **kwargs)
+        self.headings = tuple(headings)
+        self.height = height
+        self.store = RowStore((), len(self.headings))
+        self.offset = 0
+        self.items = []
+        self.filter_id = None
+
+        toolbar = ttk.Frame(self)
+        toolbar.grid(row=0, column=0, columnspan=2, sticky='ew', pady=(0, 2))
+        ttk.Label(toolbar, text="Filter:").pack(side='left')
+        self.filter_text = tk.StringVar()
+        self.filter_text.trace_add('write', self.schedule_filter)
+        ttk.Entry(toolbar, textvariable=self.filter_text, width=30).pack(side='left', padx=(2, 10))
+        ttk.Button(toolbar, text="Copy all as CSV", command=self.copy_csv).pack(side='left')
+        self.count_label = ttk.Label(toolbar, text="")
+        self.count_label.pack(side='right')
+
+        columns = [f'c{index}' for index in range(len(self.headings))]
+        self.tree = ttk.Treeview(self, columns=columns, show='headings', height=height, selectmode='browse')
+        for index, (column, heading) in enumerate(zip(columns, self.headings)):
+            self.tree.heading(column, text=heading, command=lambda index=index: self.sort_by(index))
+            self.tree.column(column, width=column_width, stretch=True)
+        self.scrollbar = ttk.Scrollbar(self, orient='vertical', command=self.on_scroll)
+        self.tree.grid(row=1, column=0, sticky='nsew')
+        self.scrollbar.grid(row=1, column=1, sticky='ns')
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(1, weight=1)
+
+        # The tree never scrolls itself: its items are the visible window
+        self.tree.bind('<MouseWheel>', lambda event: self.scroll_by(-WHEEL_ROWS if event.delta > 0 else WHEEL_ROWS))
+        self.tree.bind('<Button-4>', lambda event: self.scroll_by(-WHEEL_ROWS))
+        self.tree.bind('<Button-5>', lambda event: self.scroll_by(WHEEL_ROWS))
+        self.tree.bind('<Prior>', lambda event: self.scroll_by(-self.height))
+        self.tree.bind('<Next>', lambda event: self.scroll_by(self.height))
+        self.tree.bind('<Home>', lambda event: self.scroll_to(0) or 'break')
+        self.tree.bind('<End>', lambda event: self.scroll_to(len(self.store)) or 'break')
+        self.render()
+
+    def set_rows(self, rows):
+        # Keeps the sort column and filter of the previous result
+        previous = self.store
+        self.store = RowStore(rows, len(self.headings))
+        if previous.sort_column is not None:
+            self.store.sort(previous.sort_column, previous.descending)
+        self.store.apply_filter(self.filter_text.get())
+        self.scroll_to(0)
+
+    #------------ Scrolling ------
+    def on_scroll(self, action, amount, unit=None):
+        if action == 'moveto':
+            self.scroll_to(int(float(amount) * len(self.store)))
+        elif action == 'scroll':
+            self.scroll_by(int(amount) * (self.height if unit == 'pages' else 1))
+
+    def scroll_by(self, rows):
+        self.scroll_to(self.offset + rows)
+        return 'break'
+
+    def scroll_to(self, offset):
+        self.offset = max(0, min(offset, len(self.store) - self.height))
+        self.render()
+
+    def render(self):
+        page = self.store.page(self.offset, self.height)
+        while len(self.items) < len(page):
+            self.items.append(self.tree.insert('', 'end'))
+        while len(self.items) > len(page):
+            self.tree.delete(self.items.pop())
+        for item, row in zip(self.items, page):
+            self.tree.item(item, values=row)
+
+        total = len(self.store)
+        if total:
+            self.scrollbar.set(self.offset / total, (self.offset + len(page)) / total)
+        else:
+            self.scrollbar.set(0.0, 1.0)
+        shown = f"{total:,} of {len(self.store.rows):,} rows" if self.store.needle else f"{total:,} rows"
+        self.count_label.config(text=shown)
+
+    #------------ Sort, filter, copy ------
+    def sort_by(self, column):
+        descending = self.store.sort_column == column and not self.store.descending
+        self.store.sort(column, descending)
+        for index, heading in enumerate(self.headings):
+            mark = SORT_MARKS[descending] if index == column else ''
+            self.tree.heading(f'c{index}', text=heading + mark)
+        self.scroll_to(0)
+
+    def schedule_filter(self, *args):
+        # Filter once typing pauses rather than on every keystroke
+        if self.filter_id is not None:
+            self.after_cancel(self.filter_id)
+        self.filter_id = self.after(FILTER_DELAY_MS, self.run_filter)
+
+    def run_filter(self):
+        self.filter_id = None
+        self.store.apply_filter(self.filter_text.get())
+        self.scroll_to(0)
+
+    def copy_csv(self):
+        # Straight from the store to the clipboard, same quoting as SQLExportDS
+        out = io.StringIO()
+        writer = csv.writer(out, lineterminator='\n')
+        writer.writerow(self.headings)
+        writer.writerows(self.store.iter_view())
+        self.clipboard_clear()
+        self.clipboard_append(out.getvalue())
+        self.count_label.config(text=f"{len(self.store):,} rows copied")
@@ -0,0 +1,275 @@
+import io
+import os
+import queue
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from time import monotonic
+
+from SQLAnalyzerDS import error_row
+from SQLDialectDS import DialectDetector, backslash_escapes
+from SQLFingerprintDS import fingerprint
+from SQLProfileDS import Profiler
+import SQLScriptDS
+from SQLScriptDS import analyze_statement, init_worker, iter_statements
+from SQLTablesDS import dependency_rows, table_dependencies
+from SQLWorkerDS import AnalysisWorker
+
+# Guarded batch analysis: every statement runs on a warm AnalysisWorker under
+# a wall-time and a memory (resident set) budget, watched from the parent. A
+# statement that runs past either budget, or takes its process down, gets the
+# process killed and replaced; it is recorded in the quarantine report under
+# its query fingerprint and retried with the table-only token scan, under the
+# same budgets, so a run over bad inputs still finishes on schedule.
+
+POLL_INTERVAL = 0.1  # seconds between budget checks of a running statement
+SHAPE_PREVIEW = 200
+QUARANTINE_FIELDS = ('source_file', 'statement_index', 'fingerprint', 'reason', 'elapsed', 'peak_mb', 'retry',
+                     'statement_chars', 'shape')
+MB = 1 << 20
+
+#------------ Process memory ------
+if sys.platform == 'win32':
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                    ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                    ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                    ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+    PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+    kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+    kernel32.OpenProcess.restype = wintypes.HANDLE
+    kernel32.OpenProcess.argtypes = (wintypes.DWORD, wintypes.BOOL, wintypes.DWORD)
+    kernel32.K32GetProcessMemoryInfo.argtypes = (wintypes.HANDLE, ctypes.POINTER(PROCESS_MEMORY_COUNTERS),
+                                                 wintypes.DWORD)
+    kernel32.CloseHandle.argtypes = (wintypes.HANDLE,)
+
+    def process_rss(pid):
+        handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            return None
+        try:
+            counters = PROCESS_MEMORY_COUNTERS()
+            counters.cb = ctypes.sizeof(counters)
+            if not kernel32.K32GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+                return None
+            return counters.WorkingSetSize
+        finally:
+            kernel32.CloseHandle(handle)
+else:
+    PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+    def process_rss(pid):
+        # Resident set size in bytes; None where /proc isn't available, in
+        # which case only the time budget is enforced
+        try:
+            with open(f'/proc/{pid}/statm') as f:
+                return int(f.read().split()[1]) * PAGE_SIZE
+        except (OSError, ValueError, IndexError):
+            return None
+
+#------------ Worker process ------
+def guard_worker_loop(requests, results, catalog=None, dialect="snowflake"):
+    init_worker(catalog, dialect)
+    while True:
+        job = requests.get()
+        if job is None:
+            break
+        results.put(run_job(*job))
+
+def run_job(path, index, statement, tables_only, profile):
+    # (rows, report) of one statement: column lineage, or the table-level
+    # dependency rows of SQLTablesDS
+    if tables_only:
+        escapes = backslash_escapes(SQLScriptDS.worker_dialect)
+        try:
+            rows = list(dependency_rows(table_dependencies(statement, escapes)))
+        except Exception as e:
+            rows = [error_row(e)]
+        for row in rows:
+            row['statement_index'] = index
+        return rows, None
+    if isinstance(SQLScriptDS.worker_dialect, DialectDetector):
+        SQLScriptDS.worker_dialect.use_source(path, os.path.dirname(path))
+    return analyze_statement((index, statement, profile))
+
+def table_lineage_rows(rows):
+    # Dependency rows of a table-only retry in the lineage layout: object ->
+    # table edges with the columns left empty
+    for row in rows:
+        if 'depends_on' not in row:
+            yield row
+            continue
+        yield {'statement_index': row['statement_index'], 'target_object': row['target_object'],
+               'result_query': row['object'], 'result_column': '', 'source_table': row['depends_on'],
+               'source_column': ''}
+
+def combine_reports(reports):
+    # One worker report (profile + dialect counters) from per-statement ones
+    profiler = Profiler()
+    dialects = {}
+    profiled = False
+    for report in reports:
+        if not report:
+            continue
+        if 'phases' in report:
+            profiler.merge(report)
+            profiled = True
+        for name, amount in report.get('dialects', {}).items():
+            dialects[name] = dialects.get(name, 0) + amount
+    report = profiler.report() if profiled else None
+    if dialects:
+        report = dict(report or {}, dialects=dialects)
+    return report
+
+#------------ Parent ------
+class StatementGuard:
+    """Budgets for guarded batch runs: `timeout` seconds and `memory_mb`
+    megabytes (worker resident set) per statement, either None for no limit.
+    map() analyzes files on `workers` guarded processes; quarantined
+    statements collect in `quarantine` (QUARANTINE_FIELDS rows)."""
+
+    def __init__(self, timeout=None, memory_mb=None, workers=None):
+        self.timeout = timeout
+        self.memory = memory_mb * MB if memory_mb else None
+        self.size = workers or os.cpu_count() or 1
+        self.quarantine = []
+        self.quarantined_files = set()
+        self.lock = threading.Lock()
+        self.counters = {'statements': 0, 'quarantined': 0, 'timeout': 0, 'memory': 0, 'crashed': 0,
+                         'retried': 0, 'recycled': 0}
+
+    def count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def map(self, items, catalog=None, dialect="snowflake", profile=False, tables_only=False):
+        # items: paths, or (path, sql) pairs already read; yields
+        # (path, rows, report) in order, like SQLBatchDS.map_files
+        if not items:
+            return
+        target = partial(guard_worker_loop, catalog=catalog, dialect=dialect)
+        workers = [AnalysisWorker(target) for _ in range(min(self.size, len(items)))]
+        idle = queue.Queue()
+        for worker in workers:
+            idle.put(worker)
+        analyze = partial(self.analyze_item, idle, profile=profile, tables_only=tables_only,
+                          escapes=backslash_escapes(dialect))
+        try:
+            with ThreadPoolExecutor(max_workers=len(workers)) as threads:
+                yield from threads.map(analyze, items)
+        finally:
+            for worker in workers:
+                worker.close()
+
+    def analyze_item(self, idle, item, profile=False, tables_only=False, escapes=True):
+        path, sql = item if isinstance(item, tuple) else (item, None)
+        worker = idle.get()
+        try:
+            try:
+                stream = io.StringIO(sql) if sql is not None else open(path, encoding='utf-8')
+            except OSError as e:
+                return path, [error_row(e)], None
+            rows, reports = [], []
+            with stream:
+                for statement_rows, report in self.iter_results(worker, path, stream, profile, tables_only, escapes):
+                    rows.extend(statement_rows)
+                    reports.append(report)
+            return path, rows, combine_reports(reports)
+        finally:
+            idle.put(worker)
+
+    def iter_file(self, path, catalog=None, dialect="snowflake", profile=False, tables_only=False):
+        # (rows, report) per statement of one file, streamed from it on a
+        # guarded process of its own, for files too large to hold at once
+        worker = AnalysisWorker(partial(guard_worker_loop, catalog=catalog, dialect=dialect))
+        try:
+            try:
+                stream = open(path, encoding='utf-8')
+            except OSError as e:
+                yield [error_row(e)], None
+                return
+            with stream:
+                yield from self.iter_results(worker, path, stream, profile, tables_only, backslash_escapes(dialect))
+        finally:
+            worker.close()
+
+    def iter_results(self, worker, path, stream, profile=False, tables_only=False, escapes=True):
+        # Statements are split here so each one is submitted, timed and, if
+        # need be, quarantined on its own
+        for index, statement in enumerate(iter_statements(stream, escapes=escapes), 1):
+            yield self.run_statement(worker, path, index, statement, profile, tables_only)
+
+    def run_statement(self, worker, path, index, statement, profile=False, tables_only=False):
+        self.count('statements')
+        result, reason, elapsed, peak = self.execute(worker, (path, index, statement, tables_only, profile))
+        if reason is None:
+            return result
+
+        self.count('quarantined')
+        self.count(reason)
+        key, shape = fingerprint(statement)
+        entry = {'source_file': path, 'statement_index': index, 'fingerprint': key, 'reason': reason,
+                 'elapsed': round(elapsed, 3), 'peak_mb': round(peak / MB, 1), 'retry': '',
+                 'statement_chars': len(statement), 'shape': shape[:SHAPE_PREVIEW]}
+        rows = [dict(error_row(self.budget_error(reason)), statement_index=index)]
+        if not tables_only:
+            retry, retry_reason, _, _ = self.execute(worker, (path, index, statement, True, False))
+            if retry_reason is None:
+                self.count('retried')
+                rows = list(table_lineage_rows(retry[0]))
+                entry['retry'] = 'tables'
+            else:
+                entry['retry'] = f'failed: {retry_reason}'
+        with self.lock:
+            self.quarantine.append(entry)
+            self.quarantined_files.add(path)
+        return rows, None
+
+    def execute(self, worker, job):
+        # (result, None, elapsed, peak) or, once a budget is exceeded or the
+        # process died, (None, reason, elapsed, peak) with the worker replaced
+        worker.submit(*job)
+        started = monotonic()
+        peak = 0
+        while True:
+            elapsed = monotonic() - started
+            wait = POLL_INTERVAL if self.timeout is None else max(0.0, min(POLL_INTERVAL, self.timeout - elapsed))
+            result = worker.wait(wait)
+            elapsed = monotonic() - started
+            if result is not None:
+                break
+            rss = process_rss(worker.process.pid) or 0
+            peak = max(peak, rss)
+            if self.memory is not None and rss > self.memory:
+                reason = 'memory'
+            elif self.timeout is not None and elapsed >= self.timeout:
+                reason = 'timeout'
+            elif not worker.process.is_alive():
+                reason = 'crashed'
+            else:
+                continue
+            worker.cancel()
+            return None, reason, elapsed, peak
+
+        # Memory that spiked between samples stays with the process; the next
+        # statement starts on a fresh one instead
+        if self.memory is not None and (process_rss(worker.process.pid) or 0) > self.memory:
+            self.count('recycled')
+            worker.cancel()
+        return result, None, elapsed, peak
+
+    def budget_error(self, reason):
+        if reason == 'timeout':
+            return TimeoutError(f"statement exceeded {self.timeout}s")
+        if reason == 'memory':
+            return MemoryError(f"statement exceeded {self.memory // MB} MB")
+        return RuntimeError("analyzer process died")
+
+    def stats(self):
+        return dict(self.counters)
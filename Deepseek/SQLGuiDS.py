@@ -0,0 +1,177 @@
+import time
+import tkinter as tk
+from tkinter import ttk, scrolledtext
+
+from SQLAnalyzerDS import ROW_FIELDS, process_sql
+from SQLCacheDS import LineageCache
+from SQLDialectDS import AUTO, CANDIDATE_DIALECTS
+from SQLExportDS import HEADERS
+from SQLGridDS import ResultGrid
+from SQLProfileDS import Profiler, format_report
+from SQLWorkerDS import AnalysisWorker
+
+POLL_MS = 100
+DEBOUNCE_MS = 800
+DEFAULT_TIME_BUDGET = 60
+DIALECTS = (AUTO,) + CANDIDATE_DIALECTS
+
+def worker_loop(requests, results):
+    # Runs in a separate process so a pathological statement can be killed
+    cache = LineageCache(max_entries=64)
+    incremental = {}  # CTE fingerprints from the previous run of this editor
+    while True:
+        job = requests.get()
+        if job is None:
+            break
+        job_id, sql, dialect = job
+        profiler = Profiler()
+        stats = {}
+        result = process_sql(sql, dialect, cache=cache, stats=stats, incremental=incremental, profiler=profiler,
+                             compact=True)
+        results.put((job_id, result, profiler.report(), stats.get('dialect')))
+
+# GUI Implementation
+class AnalyzerApp:
+    def __init__(self, root):
+        self.root = root
+        self.worker = AnalysisWorker(worker_loop)
+        self.job_id = 0
+        self.running = False
+        self.started = 0.0
+        self.debounce_id = None
+
+        root.title("SQL Parser Analyzer")
+
+        input_label = ttk.Label(root, text="Enter SQL Statement:")
+        input_label.grid(row=0, column=0, padx=10, pady=5, sticky='w')
+
+        self.input_text = scrolledtext.ScrolledText(root, width=80, height=20)
+        self.input_text.grid(row=1, column=0, padx=10, pady=5)
+        self.input_text.bind("<KeyRelease>", self.schedule_auto_analyze)
+
+        controls = ttk.Frame(root)
+        controls.grid(row=2, column=0, padx=10, pady=5, sticky='ew')
+        self.analyze_button = ttk.Button(controls, text="Analyze", command=self.analyze_sql)
+        self.analyze_button.pack(side='left')
+        self.cancel_button = ttk.Button(controls, text="Cancel", command=self.cancel, state='disabled')
+        self.cancel_button.pack(side='left', padx=5)
+        self.auto_analyze = tk.BooleanVar(value=False)
+        ttk.Checkbutton(controls, text="Auto", variable=self.auto_analyze).pack(side='left')
+        ttk.Label(controls, text="Time budget (s):").pack(side='left', padx=(10, 2))
+        self.time_budget = tk.IntVar(value=DEFAULT_TIME_BUDGET)
+        ttk.Spinbox(controls, from_=1, to=3600, width=6, textvariable=self.time_budget).pack(side='left')
+        ttk.Label(controls, text="Dialect:").pack(side='left', padx=(10, 2))
+        self.dialect = tk.StringVar(value="snowflake")
+        ttk.Combobox(controls, values=DIALECTS, width=10, state='readonly',
+                     textvariable=self.dialect).pack(side='left')
+        self.progress = ttk.Progressbar(controls, mode='indeterminate', length=120)
+        self.progress.pack(side='left', padx=10)
+        self.status = ttk.Label(controls, text="Ready")
+        self.status.pack(side='left')
+
+        output_label = ttk.Label(root, text="Result:")
+        output_label.grid(row=3, column=0, padx=10, pady=5, sticky='w')
+
+        # Virtualized: only the visible rows of a result become widget rows
+        self.result_grid = ResultGrid(root, [HEADERS[field] for field in ROW_FIELDS], height=16)
+        self.result_grid.grid(row=4, column=0, padx=10, pady=5, sticky='nsew')
+
+        # Collapsible profile panel, filled after every analysis
+        self.profile_button = ttk.Button(root, text="Profile \u25b8", command=self.toggle_profile)
+        self.profile_button.grid(row=5, column=0, padx=10, pady=(0, 5), sticky='w')
+        self.profile_text = scrolledtext.ScrolledText(root, width=80, height=10)
+        self.profile_visible = False
+
+        root.protocol("WM_DELETE_WINDOW", self.close)
+
+    def schedule_auto_analyze(self, event=None):
+        # Re-analyze once typing has paused for DEBOUNCE_MS
+        if not self.auto_analyze.get():
+            return
+        if self.debounce_id is not None:
+            self.root.after_cancel(self.debounce_id)
+        self.debounce_id = self.root.after(DEBOUNCE_MS, self.auto_analyze_sql)
+
+    def auto_analyze_sql(self):
+        self.debounce_id = None
+        if self.running:
+            self.debounce_id = self.root.after(DEBOUNCE_MS, self.auto_analyze_sql)
+        else:
+            self.analyze_sql()
+
+    def analyze_sql(self):
+        if self.running:
+            return
+        sql_input = self.input_text.get("1.0", tk.END).strip()
+        self.job_id += 1
+        self.worker.submit(self.job_id, sql_input, self.dialect.get())
+        self.set_running(True)
+        self.root.after(POLL_MS, self.poll)
+
+    def poll(self):
+        if not self.running:
+            return
+        elapsed = time.monotonic() - self.started
+        done = self.worker.poll()
+        if done is not None:
+            job_id, result, report, dialect = done
+            if job_id == self.job_id:
+                self.set_running(False, f"Done in {elapsed:.1f}s, {len(result)} rows ({dialect or 'cached'})")
+                self.show_result(result)
+                self.show_profile(report)
+                return
+        try:
+            budget = self.time_budget.get()
+        except tk.TclError:
+            budget = DEFAULT_TIME_BUDGET
+        if elapsed > budget:
+            self.worker.cancel()
+            self.set_running(False, f"Stopped: exceeded time budget of {budget}s")
+            return
+        self.status.config(text=f"Analyzing... {elapsed:.1f}s")
+        self.root.after(POLL_MS, self.poll)
+
+    def cancel(self):
+        if self.running:
+            self.worker.cancel()
+            self.set_running(False, "Cancelled")
+
+    def set_running(self, running, message="Analyzing..."):
+        self.running = running
+        if running:
+            self.started = time.monotonic()
+            self.progress.start(10)
+        else:
+            self.progress.stop()
+        self.analyze_button.config(state='disabled' if running else 'normal')
+        self.cancel_button.config(state='normal' if running else 'disabled')
+        self.status.config(text=message)
+
+    def show_result(self, result):
+        # Compact LineageRow tuples start with the ROW_FIELDS columns
+        self.result_grid.set_rows(result)
+
+    def show_profile(self, report):
+        self.profile_text.delete("1.0", tk.END)
+        self.profile_text.insert(tk.END, format_report(report))
+
+    def toggle_profile(self):
+        self.profile_visible = not self.profile_visible
+        if self.profile_visible:
+            self.profile_text.grid(row=6, column=0, padx=10, pady=5)
+            self.profile_button.config(text="Profile \u25be")
+        else:
+            self.profile_text.grid_remove()
+            self.profile_button.config(text="Profile \u25b8")
+
+    def close(self):
+        self.worker.close()
+        self.root.destroy()
+
+def main():
+    root = tk.Tk()
+    AnalyzerApp(root)
+    root.mainloop()
+
+if __name__ == "__main__":
+    main()
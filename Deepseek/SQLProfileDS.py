@@ -0,0 +1,66 @@
+import json
+import sys
+from time import perf_counter
+
+class Profiler:
+    """Per-phase wall time / call counts plus named counters for one or more
+    analyses. Scope phases (from_join, trace_column_source) are exclusive:
+    each scope is timed on its own, not inside the scope that encloses it.
+    process_ctes and total contain the scope phases that run within them."""
+
+    def __init__(self):
+        self.phases = {}    # phase -> [calls, seconds]
+        self.counters = {}
+        self.maxima = {}
+
+    def add_time(self, phase, started):
+        elapsed = perf_counter() - started
+        entry = self.phases.get(phase)
+        if entry is None:
+            self.phases[phase] = [1, elapsed]
+        else:
+            entry[0] += 1
+            entry[1] += elapsed
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def maximum(self, name, value):
+        if value > self.maxima.get(name, 0):
+            self.maxima[name] = value
+
+    def report(self):
+        return {
+            'phases': {phase: {'calls': calls, 'seconds': round(seconds, 6)}
+                       for phase, (calls, seconds) in self.phases.items()},
+            'counters': dict(self.counters),
+            'maxima': dict(self.maxima)
+        }
+
+    def merge(self, report):
+        # Folds in a report() produced elsewhere, e.g. by a batch worker process
+        for phase, entry in report.get('phases', {}).items():
+            current = self.phases.setdefault(phase, [0, 0.0])
+            current[0] += entry['calls']
+            current[1] += entry['seconds']
+        for name, amount in report.get('counters', {}).items():
+            self.count(name, amount)
+        for name, value in report.get('maxima', {}).items():
+            self.maximum(name, value)
+
+def format_report(report):
+    lines = [f"{'PHASE':<24}{'CALLS':>10}{'SECONDS':>12}"]
+    for phase, entry in sorted(report['phases'].items(), key=lambda item: -item[1]['seconds']):
+        lines.append(f"{phase:<24}{entry['calls']:>10}{entry['seconds']:>12.4f}")
+    for name, value in sorted(report['counters'].items()) + sorted(report['maxima'].items()):
+        lines.append(f"{name:<24}{value:>10}")
+    return '\n'.join(lines)
+
+def write_report(report, path=None):
+    # JSON to a file, or to stderr when no path is given
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if path in (None, '-'):
+        print(text, file=sys.stderr)
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
@@ -0,0 +1,142 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, BrokenExecutor, ProcessPoolExecutor, wait
+
+import SQLAnalyzerDS
+from SQLAnalyzerDS import process_cte
+
+# Resolves the CTEs of a statement as a DAG on a process pool: a CTE is
+# submitted as soon as every CTE it reads is resolved, so the independent
+# branches of a 200-CTE dbt model run side by side. A job carries the CTE
+# subtree plus the memos of its direct upstream CTEs, which are fully resolved
+# and all a CTE ever looks up; the entry and the memo hits it made on its
+# upstreams come back and are merged into the registry in the parent.
+# Lineage is the same as process_ctes' serial loop: each CTE sees exactly the
+# upstream CTEs it sees there.
+
+# Below this many CTEs to resolve, shipping them to the pool costs more than
+# it saves and the statement is resolved serially
+MIN_PARALLEL_CTES = 32
+UPSTREAM_FIELDS = ('name', 'columns', 'memo', 'cost')
+
+def init_cte_worker(catalog=None):
+    # Pool workers resolve with the catalog of the analysis that started them
+    SQLAnalyzerDS.active_catalog = catalog
+
+def resolve_cte(job):
+    cte_name, cte, upstream, cyclic, fingerprint, cost, upstream_entries = job
+    registry = {dep: dict(entry, memo_hits=0, memo_saved=0) for dep, entry in upstream_entries.items()}
+    entry = process_cte(cte, upstream, cyclic, fingerprint, cost, registry)
+    # Scope internals are only needed while the CTE is traced; sending them
+    # back would copy every upstream entry they point to
+    entry['tables'] = []
+    hits = {dep: (upstream_entry['memo_hits'], upstream_entry['memo_saved'])
+            for dep, upstream_entry in registry.items() if upstream_entry['memo_hits']}
+    return entry, hits
+
+class CteScheduler:
+    """Process pool for process_ctes, kept across statements. Statements with
+    fewer than `min_ctes` CTEs to resolve are resolved serially, in dependency
+    order; so is any CTE whose job fails (e.g. a subtree too deep to pickle)."""
+
+    def __init__(self, workers=None, min_ctes=MIN_PARALLEL_CTES):
+        self.workers = workers or os.cpu_count() or 1
+        self.min_ctes = min_ctes
+        self.pool = None
+        self.pool_catalog = None
+        self.broken = False
+        self.counters = {'statements': 0, 'parallel': 0, 'serial': 0, 'fallbacks': 0}
+
+    def resolve(self, jobs, cte_registry):
+        # jobs: [(name, cte, upstream, cyclic, fingerprint, cost)] in dependency order;
+        # upstream CTEs that aren't among them are already in cte_registry
+        self.counters['statements'] += 1
+        if len(jobs) < self.min_ctes or self.workers < 2:
+            for job in jobs:
+                self.resolve_serial(job, cte_registry)
+            return
+
+        pool = self.get_pool(SQLAnalyzerDS.active_catalog)
+        by_name = {job[0]: job for job in jobs}
+        rank = {job[0]: position for position, job in enumerate(jobs)}
+        waiting = {name: {dep for dep in job[2] if dep in by_name} for name, job in by_name.items()}
+        dependents = {}
+        for name, deps in waiting.items():
+            for dep in deps:
+                dependents.setdefault(dep, []).append(name)
+
+        ready = [job[0] for job in jobs if not waiting[job[0]]]
+        running = {}
+        while ready or running:
+            for name in ready:
+                future = self.submit(pool, by_name[name], cte_registry)
+                if future is None:
+                    self.fallback(by_name[name], cte_registry)
+                    ready.extend(self.release(name, waiting, dependents))
+                else:
+                    running[future] = name
+            ready = []
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in sorted(done, key=lambda future: rank[running[future]]):
+                name = running.pop(future)
+                self.collect(future, by_name[name], cte_registry)
+                ready.extend(self.release(name, waiting, dependents))
+            ready.sort(key=rank.get)
+
+        if SQLAnalyzerDS.active_profiler is not None:
+            SQLAnalyzerDS.active_profiler.count('ctes_parallel', len(jobs))
+
+    def release(self, name, waiting, dependents):
+        # CTEs whose last unresolved upstream was `name`
+        for dependent in dependents.get(name, ()):
+            waiting[dependent].discard(name)
+            if not waiting[dependent]:
+                yield dependent
+
+    def submit(self, pool, job, cte_registry):
+        upstream = job[2]
+        upstream_entries = {dep: {field: cte_registry[dep][field] for field in UPSTREAM_FIELDS} for dep in upstream}
+        try:
+            return pool.submit(resolve_cte, job + (upstream_entries,))
+        except Exception as e:
+            self.broken = self.broken or isinstance(e, BrokenExecutor)
+            return None
+
+    def collect(self, future, job, cte_registry):
+        try:
+            entry, hits = future.result()
+        except Exception as e:
+            # A worker that died takes the pool with it; it is replaced for the next statement
+            self.broken = self.broken or isinstance(e, BrokenExecutor)
+            self.fallback(job, cte_registry)
+            return
+        cte_registry[job[0]] = entry
+        for dep, (memo_hits, memo_saved) in hits.items():
+            cte_registry[dep]['memo_hits'] += memo_hits
+            cte_registry[dep]['memo_saved'] += memo_saved
+        self.counters['parallel'] += 1
+
+    def fallback(self, job, cte_registry):
+        self.counters['fallbacks'] += 1
+        self.resolve_serial(job, cte_registry)
+
+    def resolve_serial(self, job, cte_registry):
+        cte_registry[job[0]] = process_cte(*job[1:], cte_registry)
+        self.counters['serial'] += 1
+
+    def get_pool(self, catalog):
+        # A pool is bound to one catalog; a different one starts a fresh pool
+        fingerprint = catalog.fingerprint if catalog is not None else None
+        if self.pool is None or self.broken or fingerprint != self.pool_catalog:
+            self.close()
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=init_cte_worker,
+                                            initargs=(catalog,))
+            self.pool_catalog = fingerprint
+            self.broken = False
+        return self.pool
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
@@ -0,0 +1,221 @@
+import argparse
+import os
+import re
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from SQLAnalyzerDS import ROW_FIELDS, iter_lineage
+from SQLCacheDS import LineageCache
+from SQLCatalogDS import load_catalog
+from SQLDialectDS import AUTO, CANDIDATE_DIALECTS, DialectDetector, backslash_escapes
+from SQLExportDS import FILE_FORMATS, FORMATS, check_export_args, export_rows
+from SQLProfileDS import Profiler, write_report
+from SQLSchedulerDS import CteScheduler
+
+CHUNK_SIZE = 1 << 20
+SCRIPT_FIELDS = ('statement_index', 'target_object') + ROW_FIELDS
+
+# Characters that can start a quote, comment or statement terminator
+SPECIAL = re.compile(r"[;'\"`\[\-/$]")
+OPENERS = {"'": "'", '"': '"', '`': '`', '[': ']'}
+BLANK = re.compile(r"(?:\s+|--[^\n]*|/\*.*?\*/)*", re.DOTALL)
+
+def iter_statements(stream, chunk_size=CHUNK_SIZE, escapes=True):
+    """Splits SQL read from a text stream on top-level semicolons, reading it in
+    chunks so memory is bounded by the largest statement, not the file.
+    escapes=False: a backslash doesn't escape a quote (see backslash_escapes)."""
+    buf = ''
+    start = 0  # where the current statement begins; emitted text is dropped on refill
+    pos = 0
+    closer = None  # end marker of the quote/comment currently open
+    eof = False
+    while True:
+        if closer is None:
+            match = SPECIAL.search(buf, pos)
+            idx = match.start() if match else -1
+        else:
+            idx = buf.find(closer, pos)
+
+        # Read more when nothing was found or a one-char lookahead is missing
+        if not eof and (idx < 0 or idx + 1 >= len(buf)):
+            chunk = stream.read(chunk_size)
+            if chunk:
+                pos = max(pos, len(buf) - len(closer or ' ')) - start
+                buf = buf[start:] + chunk
+                start = 0
+            else:
+                eof = True
+            continue
+        if idx < 0:
+            break
+
+        if closer is not None:
+            if closer == "'" and is_escaped_quote(buf, idx, escapes):
+                pos = idx + 2 if buf.startswith("''", idx) else idx + 1
+                continue
+            pos = idx + len(closer)
+            closer = None
+            continue
+
+        char = buf[idx]
+        pair = buf[idx:idx + 2]
+        if char == ';':
+            statement = buf[start:idx]
+            start = pos = idx + 1
+            if not is_blank(statement):
+                yield statement.strip()
+        elif char in OPENERS:
+            closer = OPENERS[char]
+            pos = idx + 1
+        elif pair == '--':
+            closer = '\n'
+            pos = idx + 2
+        elif pair == '/*':
+            closer = '*/'
+            pos = idx + 2
+        elif pair == '$$':
+            closer = '$$'
+            pos = idx + 2
+        else:
+            pos = idx + 1
+
+    if not is_blank(buf[start:]):
+        yield buf[start:].strip()
+
+def is_escaped_quote(buf, idx, escapes=True):
+    # '' inside a string, or \' where the dialect has backslash escapes
+    if buf.startswith("''", idx):
+        return True
+    if not escapes:
+        return False
+    backslashes = 0
+    while idx - backslashes - 1 >= 0 and buf[idx - backslashes - 1] == '\\':
+        backslashes += 1
+    return backslashes % 2 == 1
+
+def is_blank(text):
+    return BLANK.fullmatch(text) is not None
+
+# Schema catalog and dialect (name or DialectDetector) of a pool worker
+# process, installed once by init_worker so they are pickled per worker rather
+# than per statement, and a detector keeps its per-source winners
+worker_catalog = None
+worker_dialect = "snowflake"
+
+def init_worker(catalog=None, dialect="snowflake"):
+    global worker_catalog, worker_dialect
+    worker_catalog = catalog
+    worker_dialect = dialect
+
+def make_dialect(dialect, candidates=None):
+    # CLI helper: 'auto' becomes a detector over the given candidate dialects
+    if dialect == AUTO:
+        return DialectDetector(candidates or CANDIDATE_DIALECTS)
+    return dialect
+
+def worker_report(profiler):
+    # Profile report plus dialect detection counters since the last report
+    report = profiler.report() if profiler else None
+    if isinstance(worker_dialect, DialectDetector):
+        report = dict(report or {}, dialects=worker_dialect.take_counters())
+    return report
+
+def merge_report(report, profiler, dialect):
+    if not report:
+        return
+    if profiler is not None:
+        profiler.merge(report)
+    if isinstance(dialect, DialectDetector) and 'dialects' in report:
+        dialect.merge(report['dialects'])
+
+def analyze_statement(item):
+    index, statement, profile = item
+    profiler = Profiler() if profile else None
+    rows = [dict(row, statement_index=index)
+            for row in iter_lineage(statement, worker_dialect, profiler=profiler, catalog=worker_catalog)]
+    return rows, worker_report(profiler)
+
+def iter_script_lineage(stream, dialect="snowflake", cache=None, workers=1, chunk_size=CHUNK_SIZE, profiler=None,
+                        catalog=None, scheduler=None):
+    """Yields lineage rows for every statement of a script, tagged with the
+    statement number and target object (CREATE VIEW / INSERT target). With a
+    CTE scheduler statements are analyzed one at a time, their CTEs in parallel."""
+    split = iter_statements(stream, chunk_size, backslash_escapes(dialect))
+    statements = ((index, statement, profiler is not None) for index, statement in enumerate(split, 1))
+    if workers == 1 or cache is not None or scheduler is not None:
+        for index, statement, _ in statements:
+            if profiler is not None:
+                profiler.count('statements')
+            for row in iter_lineage(statement, dialect, cache, profiler=profiler, catalog=catalog,
+                                    scheduler=scheduler):
+                yield dict(row, statement_index=index)
+        return
+
+    # At most `window` statements are in flight so the splitter never runs
+    # ahead of the pool (Executor.map would read the whole script up front)
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(catalog, dialect)) as executor:
+        window = (workers or os.cpu_count() or 1) * 4
+        pending = deque()
+        for item in statements:
+            pending.append(executor.submit(analyze_statement, item))
+            if len(pending) >= window:
+                yield from collect_statement(pending.popleft(), profiler, dialect)
+        while pending:
+            yield from collect_statement(pending.popleft(), profiler, dialect)
+
+def collect_statement(future, profiler, dialect):
+    rows, report = future.result()
+    merge_report(report, profiler, dialect)
+    if profiler is not None:
+        profiler.count('statements')
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream lineage for every statement of a SQL script")
+    parser.add_argument('script', help="SQL script file ('-' reads stdin)")
+    parser.add_argument('-w', '--workers', type=int, default=1, help="worker processes (0: CPU count)")
+    parser.add_argument('-o', '--output', help="output file (default: stdout)")
+    parser.add_argument('-f', '--format', choices=FORMATS + FILE_FORMATS, default='csv',
+                        help="output format (sqlite/parquet/arrow need -o)")
+    parser.add_argument('--dialect', default='snowflake', help="sqlglot dialect, or 'auto' to detect it")
+    parser.add_argument('--dialects', default=','.join(CANDIDATE_DIALECTS),
+                        help="comma-separated candidates tried by --dialect auto")
+    parser.add_argument('--cache', help="SQLite file that keeps per-statement lineage between runs")
+    parser.add_argument('--catalog', help="information_schema columns export (CSV or JSON) used to "
+                                          "resolve unqualified columns and expand *")
+    parser.add_argument('--cte-workers', type=int, default=None, metavar='N',
+                        help="resolve the CTEs of large statements on N processes (0: CPU count) instead of "
+                             "analyzing statements in parallel")
+    parser.add_argument('--profile', nargs='?', const='-', metavar='PATH',
+                        help="write a per-phase JSON profile to PATH (default: stderr)")
+    args = parser.parse_args(argv)
+    check_export_args(parser, args.format, args.output)
+
+    catalog = load_catalog(args.catalog) if args.catalog else None
+    dialect = make_dialect(args.dialect, args.dialects.split(','))
+    if isinstance(dialect, DialectDetector):
+        dialect.use_source(args.script)
+    cache = LineageCache(path=args.cache) if args.cache else None
+    stream = sys.stdin if args.script == '-' else open(args.script, encoding='utf-8')
+    profiler = Profiler() if args.profile else None
+    scheduler = CteScheduler(args.cte_workers or None) if args.cte_workers is not None else None
+    try:
+        rows = iter_script_lineage(stream, dialect, cache, args.workers or None, profiler=profiler,
+                                   catalog=catalog, scheduler=scheduler)
+        export_rows(rows, args.output, args.format, SCRIPT_FIELDS)
+        if profiler is not None:
+            write_report(profiler.report(), args.profile)
+        if isinstance(dialect, DialectDetector):
+            print(f"dialects: {dialect.stats()}", file=sys.stderr)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+        if cache is not None:
+            cache.close()
+        if scheduler is not None:
+            scheduler.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
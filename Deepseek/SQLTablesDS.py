@@ -0,0 +1,349 @@
+import argparse
+import re
+import sys
+
+from sqlglot import exp
+
+from SQLAnalyzerDS import cte_dependency_order, error_row, normalize_name, split_statement_target
+from SQLDialectDS import backslash_escapes, parse_sql
+from SQLExportDS import FILE_FORMATS, FORMATS, check_export_args, export_rows
+from SQLScriptDS import CHUNK_SIZE, iter_statements
+
+# Table-level dependencies only: CTE names, the tables each CTE (and the main
+# query) reads, and the base tables behind them. table_dependencies() gets
+# them from a single regex token pass without building an AST;
+# tree_dependencies() is the equivalent over one parsed statement and is the
+# reference the fast path has to agree with.
+
+TABLE_FIELDS = ('statement_index', 'target_object', 'object', 'depends_on', 'depends_on_type')
+MAIN = '*MAIN'
+
+# Runs of whitespace, comments, strings and numbers are consumed as one
+# unnamed match; only words, quoted identifiers and ( ) , . ; are captured.
+# Strings end at the first quote in dialects without backslash escapes.
+TOKEN_PATTERN = r"""
+    (?:\s+ | --[^\n]* | /\*.*?\*/ | '%s*' | \$\$.*?\$\$ | \d[\w.]*)+
+  | ( "(?:[^"]|"")*" | `[^`]*` | \[[^\]]*\] | [^\W\d][\w$]* | [(),.;] )
+  | .
+"""
+TOKEN = re.compile(TOKEN_PATTERN % r"(?:[^'\\]|\\.)", re.VERBOSE | re.DOTALL)
+PLAIN_TOKEN = re.compile(TOKEN_PATTERN % r"[^']", re.VERBOSE | re.DOTALL)
+PUNCT = frozenset('(),.;')
+QUOTES = frozenset('"`[')
+
+# Keywords after which the current FROM list can't continue with a comma
+FROM_END = frozenset(('WHERE', 'GROUP', 'ORDER', 'HAVING', 'QUALIFY', 'LIMIT', 'UNION', 'INTERSECT',
+                      'EXCEPT', 'MINUS', 'WINDOW', 'SELECT', 'SET', 'VALUES', 'FETCH', 'OFFSET'))
+# Words that may precede the table of a FROM/JOIN item
+TABLE_PREFIXES = frozenset(('LATERAL', 'TABLE', 'ONLY'))
+# Words that make a parenthesis after FROM/JOIN a subquery or row list rather
+# than a parenthesized join
+QUERY_STARTS = frozenset(('SELECT', 'WITH', 'VALUES'))
+
+def tokenize(sql, escapes=True):
+    # Words keep their case and quoted identifiers their quotes, so a quoted
+    # "from" never reads as a keyword
+    return [token for token in (TOKEN if escapes else PLAIN_TOKEN).findall(sql) if token]
+
+def keyword(token):
+    return token.upper()
+
+def is_name(token):
+    return token not in PUNCT
+
+def unquote(token):
+    return token[1:-1] if token[0] in QUOTES else token
+
+def read_name(tokens, i):
+    # Dotted object name starting at i: (parts, index after it) or (None, i)
+    parts = []
+    while i < len(tokens) and is_name(tokens[i]):
+        parts.append(unquote(tokens[i]))
+        if i + 1 < len(tokens) and tokens[i + 1] == '.':
+            i += 2
+        else:
+            i += 1
+            break
+    return (parts or None), i
+
+def cte_header(tokens, i):
+    # name [(columns)] AS ( -> (name, index of the opening paren) or None
+    if i >= len(tokens) or not is_name(tokens[i]):
+        return None
+    name = unquote(tokens[i])
+    i += 1
+    if i < len(tokens) and tokens[i] == '(':
+        i = skip_parens(tokens, i)
+    if i + 1 < len(tokens) and keyword(tokens[i]) == 'AS' and tokens[i + 1] == '(':
+        return name, i + 1
+    return None
+
+def skip_parens(tokens, i):
+    # tokens[i] is '('; returns the index after its matching ')'
+    depth = 0
+    while i < len(tokens):
+        if tokens[i] == '(':
+            depth += 1
+        elif tokens[i] == ')':
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return i
+
+def skip_with(tokens):
+    # WITH [RECURSIVE] name AS (...) [, name AS (...)]: index after the last
+    # CTE body, or None if tokens don't start with a CTE list
+    i = 1
+    if i < len(tokens) and keyword(tokens[i]) == 'RECURSIVE':
+        i += 1
+    while True:
+        header = cte_header(tokens, i)
+        if header is None:
+            return None
+        i = skip_parens(tokens, header[1])
+        if i >= len(tokens) or tokens[i] != ',':
+            return i
+        i += 1
+
+def statement_target(tokens):
+    # [WITH ...] CREATE ... TABLE|VIEW name / INSERT [OVERWRITE] [INTO] [TABLE]
+    # name: (target, index where the query starts); the target isn't a source.
+    # A leading CTE list is part of the query, so it starts at 0 then.
+    start = 0
+    if tokens and keyword(tokens[0]) == 'WITH':
+        start = skip_with(tokens)
+        if start is None:
+            return '', 0
+    first = keyword(tokens[start]) if start < len(tokens) else None
+    i = start + 1
+    if first == 'CREATE':
+        while i < len(tokens) and keyword(tokens[i]) not in ('TABLE', 'VIEW'):
+            if not is_name(tokens[i]):
+                return '', 0
+            i += 1
+        i += 1
+        if i < len(tokens) and keyword(tokens[i]) == 'IF':
+            i += 3  # IF NOT EXISTS
+    elif first == 'INSERT':
+        while i < len(tokens) and keyword(tokens[i]) in ('OVERWRITE', 'INTO', 'TABLE'):
+            i += 1
+    else:
+        return '', 0
+    parts, i = read_name(tokens, i)
+    if parts is None:
+        return '', 0
+    if i < len(tokens) and tokens[i] == '(':
+        i = skip_parens(tokens, i)
+    return '.'.join(parts), (0 if start else i)
+
+def scan_references(tokens, start=0):
+    """One pass over the tokens: CTE names and every table reference with the
+    CTEs it appears inside, as (owners, name, qualified)."""
+    ctes = []
+    refs = []
+    open_ctes = []         # [(name, depth of its body)]
+    select_depths = set()  # paren depths holding a SELECT/DELETE/UPDATE, where FROM means tables
+    from_depths = set()    # paren depths where a FROM list is open
+    depth = 0
+    expect_table = False
+    merge = bool(tokens) and keyword(tokens[0]) == 'MERGE'
+    previous = None
+    i = start
+    while i < len(tokens):
+        token = tokens[i]
+        if token in PUNCT:
+            if token == '(':
+                depth += 1
+                if expect_table and i + 1 < len(tokens) and keyword(tokens[i + 1]) not in QUERY_STARTS:
+                    # FROM (t1 JOIN t2 ON ...): the table list goes on inside
+                    from_depths.add(depth)
+                else:
+                    expect_table = False
+            elif token == ')':
+                select_depths.discard(depth)
+                from_depths.discard(depth)
+                if open_ctes and open_ctes[-1][1] == depth:
+                    open_ctes.pop()
+                    header = None
+                    if i + 1 < len(tokens) and tokens[i + 1] == ',':
+                        header = cte_header(tokens, i + 2)
+                    if header is not None:
+                        # ") , name AS (": the next CTE body sits at the same depth
+                        ctes.append(header[0])
+                        open_ctes.append((header[0], depth))
+                        i = header[1] + 1
+                        continue
+                depth -= 1
+            elif token == ',' and depth in from_depths:
+                expect_table = True
+            previous = None
+            i += 1
+            continue
+
+        word = token.upper()
+        if expect_table and word in TABLE_PREFIXES:
+            i += 1
+            continue
+        if expect_table:
+            expect_table = False
+            parts, end = read_name(tokens, i)
+            # name( is a table function, not a table
+            if parts is not None and not (end < len(tokens) and tokens[end] == '('):
+                owners = tuple(name for name, _ in open_ctes)
+                refs.append((owners, parts[-1], len(parts) > 1))
+            i = end if parts is not None else i + 1
+            previous = None
+            continue
+
+        if word == 'WITH':
+            j = i + 1
+            if j < len(tokens) and keyword(tokens[j]) == 'RECURSIVE':
+                j += 1
+            header = cte_header(tokens, j)
+            if header is not None:
+                ctes.append(header[0])
+                depth += 1
+                open_ctes.append((header[0], depth))
+                i = header[1] + 1
+                continue
+        elif word == 'SELECT' or word == 'DELETE':
+            select_depths.add(depth)
+            from_depths.discard(depth)
+        elif word == 'FROM':
+            # EXTRACT(x FROM y), TRIM(... FROM y) and IS DISTINCT FROM aren't FROM clauses
+            if depth in select_depths and previous != 'DISTINCT':
+                from_depths.add(depth)
+                expect_table = True
+        elif word == 'JOIN' or word == 'USING' or (merge and word == 'INTO'):
+            expect_table = True
+        elif word == 'UPDATE':
+            select_depths.add(depth)
+            expect_table = not (i + 1 < len(tokens) and keyword(tokens[i + 1]) == 'SET')
+        elif word in FROM_END:
+            from_depths.discard(depth)
+        previous = word
+        i += 1
+    return ctes, refs
+
+def table_dependencies(sql, escapes=True):
+    """Fast path: table-level dependencies of one statement from its tokens.
+    escapes: whether \\' escapes a quote in strings (see backslash_escapes)."""
+    tokens = tokenize(sql, escapes)
+    while tokens and tokens[-1] == ';':
+        tokens.pop()
+    target, start = statement_target(tokens)
+    ctes, refs = scan_references(tokens, start)
+    return build_dependencies(target, ctes, refs)
+
+def tree_dependencies(parsed):
+    """Same result from a parsed statement, walking the one tree it is given."""
+    target, query, _ = split_statement_target(parsed)
+    if query is None:
+        return build_dependencies(target, [], [])
+    ctes = [cte.alias for cte in query.find_all(exp.CTE)]
+    refs = []
+    for table in query.find_all(exp.Table):
+        if not table.name:
+            continue
+        owners = []
+        node = table.parent
+        while node is not None:
+            if isinstance(node, exp.CTE):
+                owners.append(node.alias)
+            node = node.parent
+        refs.append((tuple(owners), table.name, bool(table.db)))
+    return build_dependencies(target, ctes, refs)
+
+def parse_table_dependencies(sql, dialect="snowflake"):
+    return tree_dependencies(parse_sql(sql, dialect)[1])
+
+def build_dependencies(target, ctes, refs):
+    # {'target', 'ctes': {cte: [direct deps]}, 'main': [direct deps],
+    #  'tables': [base tables], 'cte_tables': {cte: [base tables behind it]}}.
+    # Unqualified names that match a CTE are CTE edges, as in the analyzer.
+    definitions = {}
+    for name in ctes:
+        definitions.setdefault(normalize_name(name), name)
+    edges = {name: {} for name in definitions.values()}
+    main = {}
+    tables = {}
+    for owners, name, qualified in refs:
+        key = normalize_name(name)
+        if not qualified and key in definitions:
+            dep = definitions[key]
+        else:
+            dep = tables.setdefault(key, name)
+        for owner in owners or (None,):
+            deps = main if owner is None else edges.setdefault(definitions.get(normalize_name(owner), owner), {})
+            deps.setdefault(normalize_name(dep), dep)
+
+    # Base tables behind each CTE, resolved upstream first
+    dependencies = {normalize_name(name): [normalize_name(dep) for dep in deps.values()
+                                           if normalize_name(dep) in definitions]
+                    for name, deps in edges.items()}
+    order, _ = cte_dependency_order(dependencies)
+    behind = {}
+    for key in order:
+        found = {}
+        for dep_key, dep in edges[definitions[key]].items():
+            if dep_key in definitions:
+                found.update(behind.get(dep_key, {}))
+            else:
+                found[dep_key] = dep
+        behind[key] = found
+
+    return {
+        'target': target,
+        'ctes': {name: sorted_names(deps) for name, deps in edges.items()},
+        'main': sorted_names(main),
+        'tables': sorted_names(tables),
+        'cte_tables': {definitions[key]: sorted_names(found) for key, found in behind.items()}
+    }
+
+def sorted_names(names):
+    # {normalized: spelling} -> spellings in a stable, case-insensitive order
+    return [names[key] for key in sorted(names)]
+
+def dependency_rows(dependencies):
+    # One row per edge, object -> dependency, in the analyzer's naming
+    target = dependencies['target']
+    ctes = {normalize_name(name) for name in dependencies['ctes']}
+    for obj, deps in [(MAIN, dependencies['main'])] + list(dependencies['ctes'].items()):
+        for dep in deps:
+            dep_type = 'cte' if normalize_name(dep) in ctes else 'table'
+            yield {'target_object': target, 'object': obj, 'depends_on': dep, 'depends_on_type': dep_type}
+
+def iter_script_dependencies(stream, chunk_size=CHUNK_SIZE, escapes=True):
+    """Yields dependency rows for every statement of a script."""
+    for index, statement in enumerate(iter_statements(stream, chunk_size, escapes), 1):
+        try:
+            rows = list(dependency_rows(table_dependencies(statement, escapes)))
+        except Exception as e:
+            rows = [error_row(e)]
+        for row in rows:
+            row['statement_index'] = index
+            yield row
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Table-level dependencies of every statement of a SQL script")
+    parser.add_argument('script', help="SQL script file ('-' reads stdin)")
+    parser.add_argument('-o', '--output', help="output file (default: stdout)")
+    parser.add_argument('-f', '--format', choices=FORMATS + FILE_FORMATS, default='csv',
+                        help="output format (sqlite/parquet/arrow need -o)")
+    parser.add_argument('--dialect', default='snowflake',
+                        help="sqlglot dialect whose string escapes apply ('auto': any candidate's)")
+    args = parser.parse_args(argv)
+    check_export_args(parser, args.format, args.output)
+    escapes = backslash_escapes(args.dialect)
+
+    stream = sys.stdin if args.script == '-' else open(args.script, encoding='utf-8')
+    try:
+        export_rows(iter_script_dependencies(stream, escapes=escapes), args.output, args.format, TABLE_FIELDS)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
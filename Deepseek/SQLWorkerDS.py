@@ -0,0 +1,46 @@
+import multiprocessing
+import queue
+
+class AnalysisWorker:
+    """One warm analyzer process running `target(requests, results)`; jobs
+    are tuples put on `requests`, None stops the loop. cancel() kills the
+    process (e.g. on a pathological statement) and starts a fresh one."""
+
+    def __init__(self, target):
+        self.target = target
+        self.process = None
+        self.start()
+
+    def start(self):
+        self.requests = multiprocessing.Queue()
+        self.results = multiprocessing.Queue()
+        self.process = multiprocessing.Process(target=self.target, args=(self.requests, self.results), daemon=True)
+        self.process.start()
+
+    def submit(self, *job):
+        self.requests.put(job)
+
+    def poll(self):
+        try:
+            return self.results.get_nowait()
+        except queue.Empty:
+            return None
+
+    def wait(self, timeout=None):
+        # Next result, or None once `timeout` seconds pass without one
+        try:
+            return self.results.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def cancel(self):
+        self.process.terminate()
+        self.process.join()
+        self.start()
+
+    def close(self):
+        if self.process.is_alive():
+            self.requests.put(None)
+            self.process.join(timeout=1)
+            if self.process.is_alive():
+                self.process.terminate()
@@ -1,5 +1,10 @@
+import io
+
 import sqlglot
-from sqlglot import exp
+
+from SQLScriptDS import iter_script_lineage
+
+from SQLTablesDS import table_dependencies, tree_dependencies
 
 query = """
 with tab1 as
@@ -24,15 +29,36 @@ select
 from tab3
 """
 
-dependencies = {}
-
+# One parse, walked once (CTE bodies no longer re-serialized and re-parsed)
 tree = sqlglot.parse_one(query)
-joins = sqlglot.parse_one(query).find_all(exp.Join)
+dependencies = tree_dependencies(tree)
+print(dependencies['ctes'])
 
-for cte in sqlglot.parse_one(query).find_all(exp.CTE):
-  dependencies[cte.alias_or_name] = []
+# Token scan only, no AST
+assert table_dependencies(query) == dependencies
+print(dependencies['cte_tables'])
 
-  cte_query = cte.this.sql()
-  for table in sqlglot.parse_one(cte_query).find_all(exp.Table):
-    dependencies[cte.alias_or_name].append(table.name)
-print(dependencies)
\ No newline at end of file
+# Mixed DDL/DML script: only the INSERT ... SELECTs and the view have lineage,
+# every other statement is skipped without an Error row
+script = """
+use database analytics;
+set run_date = '2024-01-01';
+create table stage.orders (id int, amount number);
+alter table stage.orders add column region varchar;
+grant select on stage.orders to role analyst;
+insert into stage.orders select id, amount from raw.orders;
+delete from stage.orders where amount < 0;
+merge into dim.customer d using stage.customer s on d.id = s.id when matched then update set d.name = s.name;
+update stage.orders set amount = 0 where id = 1;
+create view mart.v_orders as select o.id, o.amount from stage.orders o;
+drop table if exists tmp.scratch;
+with recent as (select id, amount from raw.orders where amount > 0)
+insert into mart.recent_orders select id, amount from recent;
+"""
+rows = list(iter_script_lineage(io.StringIO(script)))
+assert all(row['result_column'] != 'Error' for row in rows), rows
+assert sorted({(row['statement_index'], row['target_object']) for row in rows}) == [
+    (6, 'stage.orders'), (10, 'mart.v_orders'), (12, 'mart.recent_orders')]
+# The statement-level WITH is a CTE, not a source table
+assert {row['source_table'] for row in rows if row['statement_index'] == 12} == {'orders'}
+print(len(rows), "rows from the mixed script")
@@ -1,8 +1,13 @@
+import csv
+import io
 import tkinter as tk
 from tkinter import scrolledtext, messagebox
 import sqlparse
 import re
 
+HEADINGS = ("RESULT COLUMN", "SOURCE TABLE", "SOURCE COLUMN")
+last_results = []
+
 def analyze_sql(sql):
     """Analyzes a SQL statement and returns a list of result columns and their source tables/columns."""
 
@@ -26,7 +31,7 @@ def analyze_sql(sql):
     for token in tokens:
         if token.is_keyword and token.value.upper() == "WITH":
             with_clause_start = True
-        elif with_clause_start and token.is_identifier:
+        elif with_clause_start and isinstance(token, sqlparse.sql.Identifier):
             with_clause_name = token.value
         elif with_clause_start and isinstance(token, sqlparse.sql.Parenthesis):
             with_clauses[with_clause_name] = str(token).strip("()")
@@ -123,36 +128,59 @@ def analyze_sql(sql):
 
 def analyze_and_display():
     """Analyzes the SQL statement and displays the results in the output text box."""
+    global last_results
     sql = sql_input.get("1.0", tk.END).strip()
     try:
         results = analyze_sql(sql)
         output_text.delete("1.0", tk.END)
         if isinstance(results, str):
+            last_results = []
             output_text.insert(tk.END, results)
         else:
-            output_text.insert(tk.END, "RESULT COLUMN\tSOURCE TABLE\tSOURCE COLUMN\n")
-            for result_column, source_table, source_column in results:
-                output_text.insert(tk.END, f"{result_column}\t{source_table}\t{source_column}\n")
+            # One insert for the whole result instead of one per row
+            last_results = results
+            lines = ["\t".join(HEADINGS)]
+            lines.extend(f"{result_column}\t{source_table}\t{source_column}"
+                         for result_column, source_table, source_column in results)
+            output_text.insert(tk.END, "\n".join(lines) + "\n")
     except Exception as e:
         messagebox.showerror("Error", f"An error occurred: {e}")
 
+def copy_as_csv():
+    """Puts the last results on the clipboard as CSV."""
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(HEADINGS)
+    writer.writerows(last_results)
+    output_text.clipboard_clear()
+    output_text.clipboard_append(out.getvalue())
+
 # UI setup
-window = tk.Tk()
-window.title("SQL Analyzer")
+def main():
+    global sql_input, output_text
+
+    window = tk.Tk()
+    window.title("SQL Analyzer")
+
+    sql_label = tk.Label(window, text="Enter SQL Statement:")
+    sql_label.pack()
+
+    sql_input = scrolledtext.ScrolledText(window, width=80, height=10)
+    sql_input.pack()
 
-sql_label = tk.Label(window, text="Enter SQL Statement:")
-sql_label.pack()
+    analyze_button = tk.Button(window, text="Analyze SQL", command=analyze_and_display)
+    analyze_button.pack()
 
-sql_input = scrolledtext.ScrolledText(window, width=80, height=10)
-sql_input.pack()
+    output_label = tk.Label(window, text="Analysis Results:")
+    output_label.pack()
 
-analyze_button = tk.Button(window, text="Analyze SQL", command=analyze_and_display)
-analyze_button.pack()
+    output_text = scrolledtext.ScrolledText(window, width=80, height=10)
+    output_text.pack()
 
-output_label = tk.Label(window, text="Analysis Results:")
-output_label.pack()
+    copy_button = tk.Button(window, text="Copy as CSV", command=copy_as_csv)
+    copy_button.pack()
 
-output_text = scrolledtext.ScrolledText(window, width=80, height=10)
-output_text.pack()
+    window.mainloop()
 
-window.mainloop()
\ No newline at end of file
+if __name__ == "__main__":
+    main()